@@ -0,0 +1,59 @@
+from typing import Hashable, Iterable, Literal
+
+from pydantic import BaseModel, Field
+
+# Normalized values blocking keys are built from, computed by the repositories: lowercased hostname, its first label
+# (`Host-1.corp.local` -> `host-1`), IPs and the lowercased MAC address with `:` separators.
+BlockingField = Literal['hostname', 'hostname_stem', 'local_ip', 'external_ip', 'mac_address']
+
+
+class BlockingConfig(BaseModel):
+    """Documents sharing all the fields of any key are matched, e.g. the same MAC address or the same short
+    hostname with the same local IP. Blocks larger than `max_block_size` are skipped as too generic to match on
+    (e.g. a default hostname shared by many machines)."""
+    enabled: bool = False
+    keys: list[list[BlockingField]] = Field(default_factory=lambda: [['hostname_stem', 'local_ip'], ['mac_address']])
+    max_block_size: int = Field(default=100, ge=2)
+
+
+class BlockingIndex:
+    """Union-find over the ids of documents sharing a blocking key.
+
+    Every block is unioned in linear time, so matching on several keys stays near-linear in the number of
+    documents, and documents linked through different keys (A and B by MAC, B and C by hostname) end up in
+    the same cluster.
+    """
+
+    def __init__(self):
+        self._parents: dict[Hashable, Hashable] = {}
+        self._sizes: dict[Hashable, int] = {}
+
+    def add_block(self, ids: Iterable[Hashable]) -> None:
+        first, *rest = ids
+        for other in rest:
+            self.union(first, other)
+
+    def find(self, item: Hashable) -> Hashable:
+        parents = self._parents
+        root = parents.setdefault(item, item)
+        while root != parents[root]:
+            root = parents[root]
+        while item != root:
+            parents[item], item = root, parents[item]
+        return root
+
+    def union(self, first: Hashable, second: Hashable) -> None:
+        first_root, second_root = self.find(first), self.find(second)
+        if first_root == second_root:
+            return
+        if self._sizes.get(first_root, 1) < self._sizes.get(second_root, 1):
+            first_root, second_root = second_root, first_root
+        self._parents[second_root] = first_root
+        self._sizes[first_root] = self._sizes.get(first_root, 1) + self._sizes.pop(second_root, 1)
+
+    def clusters(self) -> list[list[Hashable]]:
+        """Return the clusters of more than one document, ids keeping the order they were first added in."""
+        clusters: dict[Hashable, list[Hashable]] = {}
+        for item in self._parents:
+            clusters.setdefault(self.find(item), []).append(item)
+        return [cluster for cluster in clusters.values() if len(cluster) > 1]
@@ -1,6 +1,10 @@
 import logging
+from typing import AsyncIterator
 
+from src.application.services.blocking_index import BlockingConfig, BlockingIndex
+from src.core.entities import HostUnmergedDataGroup
 from src.core.ports.merger import Merger
+from src.core.ports.metrics import get_metrics
 from src.core.ports.repositories import HostNormalizedDataRepository
 
 logger = logging.getLogger(__name__)
@@ -12,23 +16,63 @@ class DeduplicationService:
             collection: str,
             normal_repository: HostNormalizedDataRepository,
             merger: Merger,
+            transactional: bool = False,
+            blocking: BlockingConfig | None = None,
     ):
         self.collection = collection
         self.normal_repository = normal_repository
         self.merger = merger
+        self.transactional = transactional
+        self.blocking = blocking
 
-    async def deduplicate(self, batch_size: int = 10):
-        logger.info(f'Deduplicating {self.collection}')
-        async for groups_batch in self.normal_repository.get_unmerged_docs_groups(
+    async def deduplicate(self, batch_size: int = 10, incremental: bool = False) -> int:
+        logger.info(f'Deduplicating {self.collection}{" incrementally" if incremental else ""}')
+        marker = await self.normal_repository.claim_dedup_pending(self.collection)
+        merged_count = 0
+        metrics = get_metrics()
+        marker_filter = marker if incremental else None
+        if self.blocking and self.blocking.enabled:
+            groups_batches = self._get_clustered_docs_groups(batch_size, marker_filter)
+        else:
+            groups_batches = self.normal_repository.get_unmerged_docs_groups(
                 collection=self.collection,
                 batch_size=batch_size,
-        ):
-            for group in groups_batch:
-                if len(group.group_docs) == 1:
-                    continue
-                merged_doc = self.merger.merge(group)
-                await self.normal_repository.delete_normalized_data_by_ids(
+                marker=marker_filter,
+            )
+        async for groups_batch in groups_batches:
+            groups = [group for group in groups_batch if len(group.group_docs) > 1]
+            merges = [
+                ([doc.id for doc in group.group_docs], merged_doc)
+                for group, merged_doc in zip(groups, self.merger.merge_batch(groups))
+            ]
+            for ids, _ in merges:
+                metrics.observe('dedup_group_size', len(ids), collection=self.collection)
+            await self.normal_repository.commit_merges(self.collection, merges, transactional=self.transactional)
+            batch_merged_count = sum(len(ids) for ids, _ in merges)
+            merged_count += batch_merged_count
+            metrics.increment('merged_docs_total', batch_merged_count, collection=self.collection)
+        await self.normal_repository.clear_dedup_pending(self.collection, marker)
+        logger.info(f'Merged {merged_count} duplicate docs in {self.collection}')
+        return merged_count
+
+    async def _get_clustered_docs_groups(self, batch_size: int, marker: str | None) -> \
+            AsyncIterator[list[HostUnmergedDataGroup]]:
+        """Group the documents linked by any blocking key, transitively, instead of by equal unique keys."""
+        index = BlockingIndex()
+        for key in self.blocking.keys:
+            blocks_count = 0
+            async for block in self.normal_repository.get_blocks(
                     collection=self.collection,
-                    ids=[doc.id for doc in group.group_docs],
-                )
-                await self.normal_repository.save_normalized_data(self.collection, [merged_doc])
+                    key=key,
+                    max_block_size=self.blocking.max_block_size,
+                    marker=marker,
+            ):
+                index.add_block(block)
+                blocks_count += 1
+            logger.info(f'Found {blocks_count} blocks by {"+".join(key)} in {self.collection}')
+
+        clusters = index.clusters()
+        clustered_count = sum(len(ids) for ids in clusters)
+        logger.info(f'Clustered {clustered_count} docs into {len(clusters)} hosts in {self.collection}')
+        for start in range(0, len(clusters), batch_size):
+            yield await self.normal_repository.get_docs_groups(self.collection, clusters[start:start + batch_size])
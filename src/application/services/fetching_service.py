@@ -1,21 +1,131 @@
 import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator
 
-from src.core.entities import HostRawData
+from pydantic import TypeAdapter, ValidationError
+
+from src.core.entities import FetchingCheckpoint, HostRawData
 from src.core.ports.api_client import APIClient
-from src.core.ports.repositories import HostRawDataRepository
+from src.core.ports.metrics import get_metrics
+from src.core.ports.repositories import FetchingStateRepository, HostRawDataRepository
 
 logger = logging.getLogger(__name__)
 
+_datetime_adapter = TypeAdapter(datetime)
+
 
 class FetchingService:
-    def __init__(self, source: str, collection: str, repository: HostRawDataRepository, api_client: APIClient):
+    def __init__(
+            self,
+            source: str,
+            collection: str,
+            repository: HostRawDataRepository,
+            api_client: APIClient,
+            state_repository: FetchingStateRepository | None = None,
+            state_collection: str | None = None,
+            incremental: bool = False,
+            cursor_field: str | None = None,
+            resume_from_offset: bool = False,
+            id_field: str | None = None,
+    ):
         self.source = source
         self.collection = collection
         self.repository = repository
         self.api_client = api_client
+        self.state_repository = state_repository
+        self.state_collection = state_collection
+        self.incremental = incremental
+        self.cursor_field = cursor_field
+        self.resume_from_offset = resume_from_offset
+        self.id_field = id_field
+        self._checkpoint: FetchingCheckpoint | None = None
+
+    async def fetch_data(self, full_resync: bool = False) -> int:
+        saved = 0
+        async for documents in self.iter_raw_data(full_resync=full_resync):
+            await self.save_raw_data(documents)
+            saved += len(documents)
+        await self.save_checkpoint()
+        return saved
+
+    async def iter_raw_data(self, full_resync: bool = False) -> AsyncIterator[list[HostRawData]]:
+        """Yield batches of new or changed hosts.
+
+        Once the source is exhausted the new checkpoint is kept in memory until `save_checkpoint` is called,
+        so callers persist it only after the yielded documents were written.
+        """
+        checkpoint = await self._load_checkpoint() if self.incremental and not full_resync else None
+        offset = checkpoint.offset if checkpoint and self.resume_from_offset else self.api_client.config.offset
+        watermark = checkpoint.cursor_value if checkpoint else None
+        if checkpoint:
+            logger.info(f'Incremental fetch from {self.api_client.slug}, offset {offset}, watermark {watermark}')
 
-    async def fetch_data(self):
-        async for hosts_raw_data in self.api_client.fetch_hosts():
+        # Hosts past the checkpoint offset were never fetched before, so they are kept regardless of the watermark.
+        new_hosts_offset = checkpoint.offset if checkpoint else offset
+        fetched, kept, cursor_value = 0, 0, watermark
+        metrics = get_metrics()
+        async for hosts_raw_data in self.api_client.fetch_hosts(offset=offset):
             logger.info(f'Fetched {len(hosts_raw_data)} hosts from {self.api_client.slug}')
-            documents = [HostRawData(source=self.source, data=data) for data in hosts_raw_data]
-            await self.repository.save_raw_data(collection=self.collection, documents=documents)
+            documents = []
+            for position, data in enumerate(hosts_raw_data, start=offset + fetched):
+                host_cursor_value = self._extract_cursor_value(data)
+                if host_cursor_value and (cursor_value is None or host_cursor_value > cursor_value):
+                    cursor_value = host_cursor_value
+                if (watermark is None or host_cursor_value is None or host_cursor_value > watermark
+                        or position >= new_hosts_offset):
+                    documents.append(HostRawData(source=self.source, data=data))
+            fetched += len(hosts_raw_data)
+            metrics.increment('fetched_hosts_total', len(hosts_raw_data), source=self.source)
+            if documents:
+                kept += len(documents)
+                metrics.increment('kept_hosts_total', len(documents), source=self.source)
+                yield documents
+
+        logger.info(f'Kept {kept} of {fetched} hosts fetched from {self.api_client.slug}')
+        self._checkpoint = FetchingCheckpoint(
+            source=self.source,
+            offset=offset + fetched,
+            cursor_value=cursor_value,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+
+    async def save_checkpoint(self) -> None:
+        # The watermark is persisted only after a complete run, so an interrupted run never skips hosts.
+        if self.state_repository and self._checkpoint:
+            await self.state_repository.save_checkpoint(self.state_collection, self._checkpoint)
+            self._checkpoint = None
+
+    async def save_raw_data(self, documents: list[HostRawData], normalize_pending: bool = True) -> None:
+        if self.id_field:
+            await self.repository.upsert_raw_data(
+                collection=self.collection,
+                documents=documents,
+                id_field=self.id_field,
+                normalize_pending=normalize_pending,
+            )
+        else:
+            await self.repository.save_raw_data(collection=self.collection, documents=documents,
+                                                normalize_pending=normalize_pending)
+
+    async def _load_checkpoint(self) -> FetchingCheckpoint | None:
+        if not self.state_repository:
+            return None
+        return await self.state_repository.get_checkpoint(self.state_collection, self.source)
+
+    def _extract_cursor_value(self, data: dict) -> datetime | None:
+        if not self.cursor_field:
+            return None
+        value = data
+        for key in self.cursor_field.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, dict):
+            value = value.get('$date')
+        if value is None:
+            return None
+        try:
+            value = _datetime_adapter.validate_python(value)
+        except ValidationError:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
@@ -1,7 +1,9 @@
 import logging
+import time
 
+from src.core.ports.metrics import get_metrics
 from src.core.ports.normalizer import Normalizer
-from src.core.ports.repositories import HostRawDataRepository, HostNormalizedDataRepository
+from src.core.ports.repositories import HostRawDataRepository, HostNormalizedDataRepository, IdRange
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +15,44 @@ class NormalizationService:
             normalizer: Normalizer,
             raw_repository: HostRawDataRepository,
             normal_repository: HostNormalizedDataRepository,
+            batch_size: int = 10,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
     ):
         self.normalizer = normalizer
         self.raw_repository = raw_repository
         self.normal_repository = normal_repository
         self.source_collection = source_collection
         self.target_collection = target_collection
+        self.batch_size = batch_size
+        self.cursor_batch_size = cursor_batch_size
+        self.projection = projection
 
-    async def normalize(self):
-        async for raw_data_batch in self.raw_repository.get_raw_data(self.source_collection):
-            normalized_data = [self.normalizer.normalize(raw_data) for raw_data in raw_data_batch]
-            logger.info(f'Normalized {len(normalized_data)} docs')
-            await self.normal_repository.save_normalized_data(self.target_collection, normalized_data)
+    async def normalize_pending(self, full_resync: bool = False) -> int:
+        """Normalize the raw documents written or changed since the last run, all of them with `full_resync`."""
+        marker = await self.raw_repository.claim_normalize_pending(self.source_collection)
+        normalized_count = await self.normalize(marker=None if full_resync else marker)
+        await self.raw_repository.clear_normalize_pending(self.source_collection, marker)
+        return normalized_count
+
+    async def normalize(self, id_range: IdRange | None = None, marker: str | None = None) -> int:
+        normalized_count = 0
+        metrics = get_metrics()
+        async for raw_data_batch in self.raw_repository.get_raw_data(
+                self.source_collection,
+                batch_size=self.batch_size,
+                id_range=id_range,
+                cursor_batch_size=self.cursor_batch_size,
+                projection=self.projection,
+                marker=marker,
+        ):
+            started_at = time.perf_counter()
+            normalized_data = [self.normalizer.normalize_record(raw_data) for raw_data in raw_data_batch]
+            metrics.observe('normalize_batch_duration_seconds', time.perf_counter() - started_at,
+                            collection=self.source_collection)
+            logger.debug(f'Normalized {len(normalized_data)} docs')
+            await self.normal_repository.save_normalized_records(self.target_collection, normalized_data)
+            normalized_count += len(normalized_data)
+            metrics.increment('normalized_docs_total', len(normalized_data), collection=self.source_collection)
+        logger.info(f'Normalized {normalized_count} docs from {self.source_collection}')
+        return normalized_count
@@ -0,0 +1,24 @@
+import logging
+
+from src.core.ports.repositories import HostNormalizedDataRepository
+
+logger = logging.getLogger(__name__)
+
+
+class HostStatsService:
+    def __init__(
+            self,
+            source_collection: str,
+            stats_collection: str,
+            normal_repository: HostNormalizedDataRepository,
+    ):
+        self.source_collection = source_collection
+        self.stats_collection = stats_collection
+        self.normal_repository = normal_repository
+
+    async def materialize(self) -> None:
+        logger.info(f'Materializing host stats of {self.source_collection} into {self.stats_collection}')
+        await self.normal_repository.materialize_host_stats(self.source_collection, self.stats_collection)
+        # Invalidates the analytics cached by the API.
+        version = await self.normal_repository.bump_data_version(self.stats_collection)
+        logger.info(f'Host stats materialized, data version {version}')
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from src.application.services.fetching_service import FetchingService
+from src.core.ports.metrics import get_metrics
+from src.core.ports.normalizer import Normalizer
+from src.core.ports.repositories import HostNormalizedDataRepository
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = None
+
+
+class StreamingPipelineService:
+    """Fetch, normalize and write one source through bounded queues instead of staging raw collections.
+
+    A full queue blocks the stage in front of it, so fetching slows down to the pace of the Mongo writes.
+    """
+
+    def __init__(
+            self,
+            fetching_service: FetchingService,
+            normalizer: Normalizer,
+            normal_repository: HostNormalizedDataRepository,
+            target_collection: str,
+            queue_size: int = 4,
+            archive_raw: bool = True,
+    ):
+        self.fetching_service = fetching_service
+        self.normalizer = normalizer
+        self.normal_repository = normal_repository
+        self.target_collection = target_collection
+        self.queue_size = queue_size
+        self.archive_raw = archive_raw
+
+    async def run(self, full_resync: bool = False) -> int:
+        raw_queue = asyncio.Queue(maxsize=self.queue_size)
+        normalized_queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [
+            asyncio.create_task(self._fetch(raw_queue, full_resync)),
+            asyncio.create_task(self._normalize(raw_queue, normalized_queue)),
+            asyncio.create_task(self._write(normalized_queue)),
+        ]
+        try:
+            _, _, written = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await self.fetching_service.save_checkpoint()
+        logger.info(f'Streamed {written} docs from {self.fetching_service.source} to {self.target_collection}')
+        return written
+
+    async def _fetch(self, raw_queue: asyncio.Queue, full_resync: bool) -> None:
+        async for raw_data_batch in self.fetching_service.iter_raw_data(full_resync=full_resync):
+            await raw_queue.put(raw_data_batch)
+            self._record_depth('raw', raw_queue)
+        await raw_queue.put(_END_OF_STREAM)
+
+    async def _normalize(self, raw_queue: asyncio.Queue, normalized_queue: asyncio.Queue) -> None:
+        while (raw_data_batch := await raw_queue.get()) is not _END_OF_STREAM:
+            self._record_depth('raw', raw_queue)
+            normalized_data = [self.normalizer.normalize_record(raw_data) for raw_data in raw_data_batch]
+            await normalized_queue.put((raw_data_batch, normalized_data))
+            self._record_depth('normalized', normalized_queue)
+        await normalized_queue.put(_END_OF_STREAM)
+
+    async def _write(self, normalized_queue: asyncio.Queue) -> int:
+        written = 0
+        while (item := await normalized_queue.get()) is not _END_OF_STREAM:
+            self._record_depth('normalized', normalized_queue)
+            raw_data_batch, normalized_data = item
+            if self.archive_raw:
+                # Already normalized here, so the batch normalization step must not normalize them again.
+                await self.fetching_service.save_raw_data(raw_data_batch, normalize_pending=False)
+            await self.normal_repository.save_normalized_records(self.target_collection, normalized_data)
+            written += len(normalized_data)
+        return written
+
+    def _record_depth(self, queue_name: str, queue: asyncio.Queue) -> None:
+        get_metrics().set_gauge('streaming_queue_depth', queue.qsize(), source=self.fetching_service.source,
+                                queue=queue_name)
@@ -1,5 +1,6 @@
 import click
 
+from src.commands.benchmark import benchmark
 from src.commands.database import database
 from src.commands.pipeline import pipeline
 
@@ -9,6 +10,7 @@ def cli():
     pass
 
 
+cli.add_command(benchmark)
 cli.add_command(database)
 cli.add_command(pipeline)
 
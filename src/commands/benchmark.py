@@ -0,0 +1,80 @@
+import logging
+
+import click
+
+logger = logging.getLogger(__name__)
+
+
+@click.group()
+def benchmark():
+    pass
+
+
+@benchmark.command(name='pipeline')
+@click.option('--hosts', 'hosts_counts', type=click.IntRange(min=1), multiple=True, default=(10_000,),
+              show_default=True, help='Hosts served by the fake API, split between sources. Repeat to run several.')
+@click.option('--duplicate-ratio', type=click.FloatRange(0, 1), default=0.2, show_default=True,
+              help='Share of CrowdStrike hosts duplicating a Qualys host.')
+@click.option('--latency', type=click.FloatRange(min=0), default=0.0, show_default=True,
+              help='Seconds the fake API waits before every response.')
+@click.option('--page-size', type=click.IntRange(min=1), default=500, show_default=True)
+@click.option('--concurrency', type=click.IntRange(min=1), default=8, show_default=True)
+@click.option('--backend', type=click.Choice(['memory', 'mongo']), default='memory', show_default=True,
+              help='Repositories backend, mongo uses benchmark_* collections of the configured database.')
+@click.option('--stream-parse', is_flag=True, help='Parse hosts while responses are read.')
+def pipeline_benchmark(hosts_counts: tuple[int, ...], duplicate_ratio: float, latency: float, page_size: int,
+                       concurrency: int, backend: str, stream_parse: bool):
+    from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig
+    from src.infrastructure.benchmarks.pipeline_benchmark import PipelineBenchmark
+    for hosts in hosts_counts:
+        config = SyntheticHostsConfig(hosts=hosts, duplicate_ratio=duplicate_ratio, latency=latency)
+        results = PipelineBenchmark(config, backend=backend, page_size=page_size, concurrency=concurrency,
+                                    stream_parse=stream_parse).run()
+        click.echo(f'\n{hosts} hosts, duplicate ratio {duplicate_ratio}, latency {latency}s, {backend} backend')
+        click.echo(f'{"stage":<10}{"docs":>10}{"seconds":>10}{"hosts/s":>12}{"peak RSS MB":>14}')
+        for result in results:
+            documents = '-' if result.documents is None else result.documents
+            click.echo(f'{result.stage:<10}{documents:>10}{result.seconds:>10.2f}{result.hosts_per_second:>12.0f}'
+                       f'{result.peak_rss_mb:>14.0f}')
+
+
+@benchmark.command(name='normalizers')
+@click.option('--hosts', type=click.IntRange(min=1), default=20_000, show_default=True, help='Hosts per source.')
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True,
+              help='Timed runs per normalizer, the fastest one is reported.')
+def normalizers_benchmark(hosts: int, repeat: int):
+    from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig
+    from src.infrastructure.benchmarks.normalizer_benchmark import NormalizerBenchmark
+    results = NormalizerBenchmark(SyntheticHostsConfig(hosts=hosts), repeat=repeat).run()
+    click.echo(f'{"source":<13}{"normalizer":<28}{"seconds":>10}{"hosts/s":>12}{"speedup":>10}')
+    for result in results:
+        click.echo(f'{result.source:<13}{result.normalizer:<28}{result.seconds:>10.3f}'
+                   f'{result.hosts_per_second:>12.0f}{result.speedup:>9.1f}x')
+
+
+@benchmark.command(name='mergers')
+@click.option('--groups', type=click.IntRange(min=1), default=20_000, show_default=True)
+@click.option('--group-size', 'group_sizes', type=click.IntRange(min=2), multiple=True, default=(2, 8),
+              show_default=True, help='Duplicates per group. Repeat to run several.')
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True,
+              help='Timed runs per merger, the fastest one is reported.')
+def mergers_benchmark(groups: int, group_sizes: tuple[int, ...], repeat: int):
+    from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig
+    from src.infrastructure.benchmarks.merger_benchmark import MergerBenchmark
+    results = MergerBenchmark(SyntheticHostsConfig(hosts=groups), group_sizes=group_sizes, repeat=repeat).run()
+    click.echo(f'{"merger":<30}{"group size":>12}{"seconds":>10}{"groups/s":>12}{"speedup":>10}')
+    for result in results:
+        click.echo(f'{result.merger:<30}{result.group_size:>12}{result.seconds:>10.3f}'
+                   f'{result.groups_per_second:>12.0f}{result.speedup:>9.1f}x')
+
+
+@benchmark.command(name='memory')
+@click.option('--hosts', type=click.IntRange(min=1), default=10_000, show_default=True)
+@click.option('--software', type=click.IntRange(min=0), default=100, show_default=True,
+              help='Software entries per host.')
+def memory_benchmark(hosts: int, software: int):
+    from src.infrastructure.benchmarks.memory_benchmark import MemoryBenchmark, MemoryBenchmarkConfig
+    results = MemoryBenchmark(MemoryBenchmarkConfig(hosts=hosts, software=software)).run()
+    click.echo(f'{"representation":<16}{"bytes/host":>12}{"vs model":>10}')
+    for result in results:
+        click.echo(f'{result.representation:<16}{result.bytes_per_host:>12.0f}{result.ratio:>9.2f}x')
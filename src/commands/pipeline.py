@@ -11,8 +11,28 @@ def pipeline():
 
 
 @pipeline.command()
-def run_pipeline():
-    from src.infrastructure.pipeline import fetching_step, normalization_step, deduplication_step
-    fetching_step()
-    normalization_step()
-    deduplication_step()
+@click.option('--full-resync', is_flag=True, default=False, help='Ignore fetching checkpoints and refetch everything.')
+@click.option('--streaming', is_flag=True, default=False, help='Fetch and normalize each source in one stream.')
+@click.option('--profile-stage',
+              type=click.Choice(['fetching', 'normalization', 'streaming', 'deduplication', 'stats']),
+              help='Sample the stacks of one stage and write them as collapsed stacks for flame graphs.')
+def run_pipeline(full_resync: bool, streaming: bool, profile_stage: str | None):
+    from bson import ObjectId
+
+    from src.infrastructure.metrics import push_metrics, setup_metrics
+    from src.infrastructure.pipeline import (get_pipeline_steps, refresh_pipeline_lock, release_pipeline_lock,
+                                             run_locked_step)
+    from src.infrastructure.profiling import enable_stage_profiling
+    # The CLI takes the lock of the pipeline jobs started through the API, so they never run at the same time.
+    owner = f'cli-{ObjectId()}'
+    if not refresh_pipeline_lock(owner):
+        raise click.ClickException('Another pipeline run holds the pipeline lock')
+    if profile_stage:
+        enable_stage_profiling(profile_stage)
+    setup_metrics()
+    try:
+        for name, step in get_pipeline_steps(full_resync=full_resync, streaming=streaming):
+            run_locked_step(owner, name, step)
+    finally:
+        release_pipeline_lock(owner)
+        push_metrics('pipeline')
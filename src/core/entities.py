@@ -1,9 +1,11 @@
 from datetime import datetime
-from typing import Any, Annotated
+from typing import Any, Annotated, Literal
 
 from bson import ObjectId
 from pydantic import BaseModel, Field, ConfigDict, BeforeValidator
 
+from src.core.records import HostRecord
+
 
 class OpenPort(BaseModel):
     service_name: str | None = None
@@ -18,6 +20,9 @@ class Software(BaseModel):
     name: str
     version: str | None = None
 
+    def __hash__(self):
+        return hash((self.name, self.version))
+
 
 # https://www.mongodb.com/developer/languages/python/python-quickstart-fastapi/
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -40,6 +45,11 @@ class HostNormalizedData(BaseModel):
     software: list[Software] | None = Field(default_factory=list)
     vuln_count: int | None = None
     sources: list[str] | None = Field(default_factory=list)
+    # Values of the fields merged by union or aggregate, by source, so a later merge replaces those of the sources
+    # normalized again and keeps the others.
+    source_values: dict[str, dict[str, Any]] | None = None
+    # Set while the document waits for deduplication, i.e. it was normalized since the last merge, never stored back.
+    dedup_pending: str | bool | None = Field(default=None, exclude=True)
 
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -50,8 +60,43 @@ class HostNormalizedData(BaseModel):
 class HostRawData(BaseModel):
     source: str
     data: dict
+    content_hash: str | None = None
+
+
+class FetchingCheckpoint(BaseModel):
+    source: str
+    offset: int = 0
+    cursor_value: datetime | None = None
+    updated_at: datetime | None = None
+
+
+JobStatus = Literal['pending', 'running', 'succeeded', 'failed']
+
+
+class PipelineJobStep(BaseModel):
+    name: str
+    status: JobStatus = 'pending'
+    documents: int | None = None
+    docs_per_second: float | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class PipelineJob(BaseModel):
+    id: str
+    status: JobStatus = 'pending'
+    full_resync: bool = False
+    streaming: bool = False
+    steps: list[PipelineJobStep] = Field(default_factory=list)
+    error: str | None = None
+    created_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
 
 class HostUnmergedDataGroup(BaseModel):
     group_id: dict[str, Any]
-    group_docs: list[HostNormalizedData]
+    # Records as read from the repository, not validated again.
+    group_docs: list[HostRecord]
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveControllerConfig(BaseModel):
+    enabled: bool = False
+    max_limit: int = Field(default=1000, ge=1)
+    max_concurrency: int = Field(default=16, ge=1)
+    target_latency: float = Field(default=2.0, gt=0)
+    healthy_streak: int = Field(default=10, ge=1)
+    growth_factor: float = Field(default=2.0, gt=1)
+    backoff_factor: float = Field(default=0.5, gt=0, lt=1)
+
+
+class AdaptiveController:
+    """AIMD-style controller for the page size and the number of requests in flight.
+
+    Page size and concurrency grow after `healthy_streak` consecutive fast responses and are cut by
+    `backoff_factor` on 429s, 5xx responses and timeouts. `Retry-After` is always honored, even when
+    the adaptive tuning itself is disabled.
+    """
+
+    def __init__(self, config: AdaptiveControllerConfig, limit: int, concurrency: int):
+        self.config = config
+        self.limit = limit
+        self.concurrency = concurrency
+        self._max_limit = config.max_limit
+        self._healthy_responses = 0
+        self._resume_at = 0.0
+
+    @property
+    def max_concurrency(self) -> int:
+        return max(self.concurrency, self.config.max_concurrency) if self.config.enabled else self.concurrency
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self, latency: float) -> None:
+        if not self.config.enabled:
+            return
+        if latency > self.config.target_latency:
+            self._healthy_responses = 0
+            self.concurrency = max(1, self.concurrency - 1)
+            logger.debug(f'Slow response ({latency:.2f}s), concurrency decreased to {self.concurrency}')
+            return
+        self._healthy_responses += 1
+        if self._healthy_responses >= self.config.healthy_streak:
+            self._healthy_responses = 0
+            self.limit = min(self._max_limit, max(self.limit + 1, int(self.limit * self.config.growth_factor)))
+            self.concurrency = min(self.config.max_concurrency, self.concurrency + 1)
+            logger.debug(f'Healthy responses, limit increased to {self.limit}, concurrency to {self.concurrency}')
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        self._healthy_responses = 0
+        if retry_after:
+            self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+        if not self.config.enabled:
+            return
+        self.limit = max(1, int(self.limit * self.config.backoff_factor))
+        self.concurrency = max(1, int(self.concurrency * self.config.backoff_factor))
+        logger.info(f'Backing off, limit decreased to {self.limit}, concurrency to {self.concurrency}')
+
+    def cap_limit(self, limit: int) -> None:
+        """Remember the page size the source actually serves when it is lower than requested."""
+        self.limit = max(1, min(self.limit, limit))
+        self._max_limit = min(self._max_limit, self.limit)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -1,21 +1,128 @@
+import asyncio
+import codecs
+import json
 import logging
+import re
+import time
 from abc import ABC
-from typing import AsyncGenerator
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterator
 
-from aiohttp import ClientResponse, ClientSession, ClientError, ContentTypeError
+from aiohttp import (ClientResponse, ClientSession, ClientError, ClientResponseError, ClientTimeout, ContentTypeError,
+                     TCPConnector)
 from pydantic import BaseModel, Field
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import (RetryCallState, retry, stop_after_attempt, wait_exponential, retry_if_exception_type,
+                      retry_if_not_exception_type)
 
+from src.core.ports.adaptive_controller import AdaptiveController, AdaptiveControllerConfig, parse_retry_after
+from src.core.ports.metrics import get_metrics
 from src.settings import API_REQUESTS_RETRY_LIMIT
 
 logger = logging.getLogger(__name__)
 
+INVALID_SKIP_LIMIT_MESSAGE = 'Error invalid skip/limit combo (>number of hosts)'
+STREAM_CHUNK_SIZE = 2 ** 16
+
+_WHITESPACE = re.compile(r'\s*')
+_ARRAY_SEPARATORS = re.compile(r'[\s,]*')
+_ITEM_END = re.compile(r'[\s,\]]')
+
+
+class APIThrottlingError(ClientResponseError):
+    """Raised for 429 and 5xx responses, so they are retried like connection errors."""
+
+
+def record_retry(retry_state: RetryCallState) -> None:
+    get_metrics().increment('api_request_retries_total', source=retry_state.args[0].slug)
+
+
+# Connection errors, timeouts and throttling are retried, a body that is not JSON would not be any better next time.
+RETRIED_ERRORS = (ClientError, asyncio.TimeoutError)
+retry_request = retry(
+    stop=stop_after_attempt(API_REQUESTS_RETRY_LIMIT),
+    wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_exception_type(RETRIED_ERRORS) & retry_if_not_exception_type(ContentTypeError),
+    before_sleep=record_retry,
+)
+
+
+class JSONArrayParser:
+    """Incremental parser of a JSON array fed with chunks of bytes, returning its items as soon as they are complete.
+
+    Items are decoded with `json.JSONDecoder.raw_decode`. An incomplete item is decoded again only once the buffer
+    has doubled, so items spanning many chunks are not re-parsed for every chunk. Numbers and literals not followed
+    by a separator yet are left for the next chunk, which may hold the rest of them.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._retry_size = 0
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> list:
+        self._buffer += self._text_decoder.decode(chunk)
+        if self._finished or len(self._buffer) < self._retry_size:
+            return []
+        return self._parse()
+
+    def close(self) -> list:
+        self._buffer += self._text_decoder.decode(b'', final=True)
+        items = [] if self._finished else self._parse()
+        # An empty body holds no array at all, but no hosts either.
+        if not self._finished and (self._started or self._buffer.strip()):
+            raise ValueError(f'Truncated JSON array, unparsed: {self._buffer[:100]!r}')
+        return items
+
+    def _parse(self) -> list:
+        buffer, position, items = self._buffer, 0, []
+        if not self._started:
+            position = _WHITESPACE.match(buffer).end()
+            if position == len(buffer):
+                return items
+            if buffer[position] != '[':
+                raise ValueError(f'Expected a JSON array, got {buffer[position:position + 100]!r}')
+            position += 1
+            self._started = True
+        self._retry_size = 0
+        while True:
+            position = _ARRAY_SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if buffer[position] == ']':
+                self._finished = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most likely an item cut by the end of the chunk, an invalid one is reported by `close`.
+                self._retry_size = 2 * (len(buffer) - position)
+                break
+            if not isinstance(item, (dict, list, str)) and not _ITEM_END.match(buffer, end):
+                # Unlike objects, arrays and strings, numbers are not delimited: `[1, 12` may go on with `3]`
+                # and `[1.` with `5]`.
+                break
+            position = end
+            items.append(item)
+        self._buffer = buffer[position:]
+        return items
+
 
 class APIClientConfig(ABC, BaseModel):
     slug: str
     api_token: str
+    endpoint_url: str | None = None
     limit: int = Field(default=1, ge=1)
     offset: int = Field(default=0, ge=0)
+    concurrency: int = Field(default=1, ge=1)
+    # Seconds to connect or to wait for the next bytes of a response, a page streamed while parsed can take longer.
+    timeout: float = Field(default=60, gt=0)
+    # Parse hosts while response bodies are read instead of loading whole pages, see `APIClient.read_page`.
+    stream_parse: bool = False
+    adaptive: AdaptiveControllerConfig = Field(default_factory=AdaptiveControllerConfig)
 
 
 class APIClient(ABC):
@@ -28,47 +135,175 @@ class APIClient(ABC):
             raise ValueError(f'Incorrect config for api client {self.__class__.__name__}. '
                              f'Slug {self.slug} does not match config slug {config.slug}.')
         self.config = config
+        if config.endpoint_url:
+            self.endpoint_url = config.endpoint_url
+        self.controller = AdaptiveController(config.adaptive, limit=config.limit, concurrency=config.concurrency)
 
-    async def fetch_hosts(self, batch_size: int = 10) -> AsyncGenerator[list[dict], None]:
-        limit = self.config.limit
-        offset = self.config.offset
+    async def fetch_hosts(self, batch_size: int = 10, offset: int | None = None) -> AsyncGenerator[list[dict], None]:
         batch = []
-        async with ClientSession() as session:
-            while content := await self.get_content(session, limit, offset):
-                batch.extend(content)
-                if len(batch) >= batch_size:
-                    yield batch
-                    batch = []
-                if len(content) < limit:
-                    yield batch
-                    logger.debug(f'Duw to api limitation for {self.slug} all possible data was fetched.')
-                    break
-                offset += limit
+        async with ClientSession(
+                connector=TCPConnector(limit=self.controller.max_concurrency),
+                timeout=ClientTimeout(total=None, sock_connect=self.config.timeout, sock_read=self.config.timeout),
+        ) as session:
+            async with aclosing(self.fetch_pages(session, offset)) as pages:
+                async for content in pages:
+                    batch.extend(content)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        if batch:
             yield batch
 
+    async def fetch_pages(self, session: ClientSession, offset: int | None = None) -> AsyncIterator[list[dict]]:
+        """Yield pages in offset order keeping up to `concurrency` requests in flight."""
+        next_offset = self.config.offset if offset is None else offset
+        in_flight: deque[tuple[int, int, asyncio.Task]] = deque()
+        try:
+            while True:
+                while len(in_flight) < self.controller.concurrency:
+                    limit = self.controller.limit
+                    task = asyncio.create_task(self.get_page(session, limit, next_offset))
+                    in_flight.append((next_offset, limit, task))
+                    next_offset += limit
+                offset, limit, task = in_flight.popleft()
+                count = 0
+                async with aclosing(self.read_page_retrying(session, await task, limit, offset)) as contents:
+                    async for content in contents:
+                        count += len(content)
+                        yield content
+                if not count:
+                    break
+                if count < limit:
+                    if not self.controller.config.enabled:
+                        logger.debug(f'Due to api limitation for {self.slug} all possible data was fetched.')
+                        break
+                    # A short page may also mean the source caps the page size below the requested limit,
+                    # so the pages requested after this one are re-requested from the right offset.
+                    self.controller.cap_limit(count)
+                    await self._cancel(in_flight)
+                    next_offset = offset + count
+        finally:
+            await self._cancel(in_flight)
+
+    @staticmethod
+    async def _cancel(in_flight: deque[tuple[int, int, asyncio.Task]]) -> None:
+        tasks = [task for _, _, task in in_flight]
+        in_flight.clear()
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, ClientResponse):
+                result.release()
+
+    async def get_page(self, session, limit: int, offset: int) -> list[dict] | ClientResponse | None:
+        """Request a page, with `stream_parse` only up to the response headers so the body is read by `read_page`
+        when the page's turn comes."""
+        if not self.config.stream_parse:
+            return await self.get_content(session, limit, offset)
+        return await self.get_response(session, limit, offset)
+
+    @retry_request
+    async def get_response(self, session, limit: int, offset: int) -> ClientResponse | None:
+        response = await self.make_request(session, limit, offset)
+        if response.status == 500 and await response.text() == INVALID_SKIP_LIMIT_MESSAGE:
+            return None
+        return response
+
+    async def read_page_retrying(self, session, page: list[dict] | ClientResponse | None, limit: int,
+                                 offset: int) -> AsyncIterator[list[dict]]:
+        """Yield the hosts of a page like `read_page`, requesting the page again if reading its body fails and
+        skipping the hosts already yielded."""
+        yielded = 0
+        for attempt in range(1, API_REQUESTS_RETRY_LIMIT + 1):
+            read = 0
+            try:
+                async with aclosing(self.read_page(page)) as contents:
+                    async for content in contents:
+                        read += len(content)
+                        if read > yielded:
+                            content, yielded = content[len(content) - (read - yielded):], read
+                            yield content
+                return
+            except RETRIED_ERRORS as e:
+                if isinstance(e, ContentTypeError) or attempt == API_REQUESTS_RETRY_LIMIT:
+                    raise
+                logger.warning(f'Error while reading a page from {self.endpoint_url} at offset {offset}: {e!r}, '
+                               f'requesting it again')
+                self.controller.record_failure()
+                get_metrics().increment('api_request_retries_total', source=self.slug)
+            page = await self.get_page(session, limit, offset)
+
+    async def read_page(self, page: list[dict] | ClientResponse | None) -> AsyncIterator[list[dict]]:
+        """Yield the hosts of a page, for a streamed response in lists of the hosts completed by every chunk read,
+        so only a chunk of the body is held in memory whatever the page size."""
+        if not isinstance(page, ClientResponse):
+            if page:
+                yield page
+            return
+        try:
+            if 'json' not in page.content_type:
+                logger.error(f'Error while parsing response from {self.endpoint_url}: '
+                             f'unexpected content type {page.content_type}')
+                raise ContentTypeError(page.request_info, page.history, status=page.status,
+                                       message=f'Attempt to decode JSON with unexpected mimetype: {page.content_type}',
+                                       headers=page.headers)
+            parser = JSONArrayParser()
+            async for chunk in page.content.iter_chunked(STREAM_CHUNK_SIZE):
+                if hosts := parser.feed(chunk):
+                    yield hosts
+            if hosts := parser.close():
+                yield hosts
+        finally:
+            page.release()
+
+    @retry_request
     async def get_content(self, session, limit: int, offset: int) -> list[dict] | None:
         response = await self.make_request(session, limit, offset)
-        if response.status == 500 and await response.text() == 'Error invalid skip/limit combo (>number of hosts)':
+        if response.status == 500 and await response.text() == INVALID_SKIP_LIMIT_MESSAGE:
             return []
         return await self.parse_response(response)
 
-    @retry(
-        stop=stop_after_attempt(API_REQUESTS_RETRY_LIMIT),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type(ClientError)
-    )
     async def make_request(self, session, limit: int, offset: int) -> ClientResponse:
+        await self.controller.wait()
+        started_at = time.monotonic()
         try:
             response = await session.request(
                 method=self.method,
                 url=self.endpoint_url,
-                params={'limit': limit, 'skip': offset},
-                headers={'Token': self.config.api_token},
+                params=self.request_params(limit, offset),
+                headers=self.request_headers(),
             )
-            return response
-        except ClientError as e:
-            logger.error(f'Error while fetching data from {self.endpoint_url}: {e}')
+        except (ClientError, asyncio.TimeoutError) as e:
+            logger.error(f'Error while fetching data from {self.endpoint_url}: {e!r}')
+            self.controller.record_failure()
+            get_metrics().observe('api_request_duration_seconds', time.monotonic() - started_at, source=self.slug,
+                                  status='error')
             raise
+        get_metrics().observe('api_request_duration_seconds', time.monotonic() - started_at, source=self.slug,
+                              status=str(response.status))
+
+        if response.status == 429 or response.status >= 500:
+            text = await response.text()
+            if response.status == 500 and text == INVALID_SKIP_LIMIT_MESSAGE:
+                return response
+            logger.warning(f'{self.endpoint_url} responded with {response.status}, backing off')
+            self.controller.record_failure(retry_after=parse_retry_after(response.headers.get('Retry-After')))
+            raise APIThrottlingError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=text,
+                headers=response.headers,
+            )
+
+        self.controller.record_success(time.monotonic() - started_at)
+        return response
+
+    def request_params(self, limit: int, offset: int) -> dict:
+        return {'limit': limit, 'skip': offset}
+
+    def request_headers(self) -> dict:
+        return {'Token': self.config.api_token}
 
     async def parse_response(self, response: ClientResponse) -> list[dict]:
         try:
@@ -6,3 +6,6 @@ from src.core.entities import HostNormalizedData, HostUnmergedDataGroup
 class Merger(ABC):
     def merge(self, group: HostUnmergedDataGroup) -> HostNormalizedData:
         raise NotImplementedError
+
+    def merge_batch(self, groups: list[HostUnmergedDataGroup]) -> list[HostNormalizedData]:
+        return [self.merge(group) for group in groups]
@@ -0,0 +1,51 @@
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class Metrics(ABC):
+    """Sink for the pipeline's counters, gauges and histograms, keyed by metric name and labels."""
+
+    @abstractmethod
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    @abstractmethod
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    @abstractmethod
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+
+class NoOpMetrics(Metrics):
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+
+_metrics: Metrics = NoOpMetrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> None:
+    global _metrics
+    _metrics = metrics
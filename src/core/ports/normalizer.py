@@ -1,9 +1,17 @@
 from abc import ABC, abstractmethod
 
 from src.core.entities import HostRawData, HostNormalizedData
+from src.core.records import HostRecord
 
 
 class Normalizer(ABC):
     @abstractmethod
     def normalize(self, data: HostRawData) -> HostNormalizedData:
         ...
+
+    def normalize_document(self, data: HostRawData) -> dict:
+        """Return the normalized document as stored, normalizers producing it without the model override this."""
+        return self.normalize(data).model_dump()
+
+    def normalize_record(self, data: HostRawData) -> HostRecord:
+        return HostRecord.from_document(self.normalize_document(data))
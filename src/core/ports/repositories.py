@@ -3,27 +3,82 @@ from typing import AsyncIterator, Iterable
 
 from bson import ObjectId
 
-from src.core.entities import HostNormalizedData, HostRawData, HostUnmergedDataGroup
+from src.core.entities import (FetchingCheckpoint, HostNormalizedData, HostRawData, HostUnmergedDataGroup,
+                               PipelineJob)
+from src.core.records import HostRecord
+
+# Half-open [start, end) range of document ids, `None` means unbounded.
+IdRange = tuple[ObjectId | None, ObjectId | None]
 
 
 class HostRawDataRepository(ABC):
+    # Written documents are flagged `normalize_pending` unless told otherwise, upserts skip unchanged ones.
+    @abstractmethod
+    async def save_raw_data(self, collection: str, documents: Iterable[HostRawData],
+                            normalize_pending: bool = True) -> None:
+        ...
+
+    @abstractmethod
+    async def upsert_raw_data(self, collection: str, documents: Iterable[HostRawData], id_field: str,
+                              normalize_pending: bool = True) -> None:
+        ...
+
+    @abstractmethod
+    async def get_raw_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            id_range: IdRange | None = None,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+            marker: str | None = None,
+    ) -> AsyncIterator[list[HostRawData]]:
+        """Yield the raw documents, only the ones claimed with `marker` when given."""
+        ...
+
+    @abstractmethod
+    async def claim_normalize_pending(self, collection: str) -> str:
+        ...
+
+    @abstractmethod
+    async def clear_normalize_pending(self, collection: str, marker: str) -> None:
+        ...
+
     @abstractmethod
-    async def save_raw_data(self, collection: str, documents: Iterable[HostRawData]) -> None:
+    async def get_id_ranges(self, collection: str, partitions: int) -> list[IdRange]:
+        ...
+
+
+class FetchingStateRepository(ABC):
+    @abstractmethod
+    async def get_checkpoint(self, collection: str, source: str) -> FetchingCheckpoint | None:
         ...
 
     @abstractmethod
-    async def get_raw_data(self, collection: str, batch_size: int = 10) -> AsyncIterator[list[HostRawData]]:
+    async def save_checkpoint(self, collection: str, checkpoint: FetchingCheckpoint) -> None:
         ...
 
 
 class HostNormalizedDataRepository(ABC):
     @abstractmethod
-    async def save_normalized_data(self, collection: str, documents: Iterable[HostNormalizedData]) -> None:
+    async def save_normalized_data(self, collection: str, documents: Iterable[HostNormalizedData],
+                                   dedup_pending: bool = True) -> None:
         ...
 
     @abstractmethod
-    async def get_normalized_data(self, collection: str, batch_size: int = 10) -> AsyncIterator[
-        list[HostNormalizedData]]:
+    async def save_normalized_records(self, collection: str, records: list[HostRecord],
+                                      dedup_pending: bool = True) -> None:
+        """Save hosts normalized as records, e.g. by `Normalizer.normalize_record`."""
+        ...
+
+    @abstractmethod
+    async def get_normalized_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+    ) -> AsyncIterator[list[HostNormalizedData]]:
         ...
 
     @abstractmethod
@@ -31,10 +86,47 @@ class HostNormalizedDataRepository(ABC):
         ...
 
     @abstractmethod
-    async def get_unmerged_docs_groups(self, collection, batch_size: int = 1) -> AsyncIterator[
-        list[HostUnmergedDataGroup]]:
+    async def get_unmerged_docs_groups(self, collection, batch_size: int = 1, marker: str | None = None) -> \
+            AsyncIterator[list[HostUnmergedDataGroup]]:
+        ...
+
+    @abstractmethod
+    async def get_blocks(self, collection: str, key: list[str], max_block_size: int, marker: str | None = None) -> \
+            AsyncIterator[list[ObjectId]]:
+        """Yield the ids of documents sharing the normalized values of every field of `key` (see `BlockingField`),
+        for blocks of 2 to `max_block_size` documents and, with a `marker`, holding a document claimed with it."""
+        ...
+
+    @abstractmethod
+    async def get_docs_groups(self, collection: str, clusters: list[list[ObjectId]]) -> list[HostUnmergedDataGroup]:
+        ...
+
+    @abstractmethod
+    async def commit_merges(self, collection: str, merges: list[tuple[list[str], HostNormalizedData]],
+                            transactional: bool = False) -> None:
         ...
 
+    @abstractmethod
+    async def claim_dedup_pending(self, collection: str) -> str:
+        ...
+
+    @abstractmethod
+    async def clear_dedup_pending(self, collection: str, marker: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get_data_version(self, collection: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def bump_data_version(self, collection: str) -> str:
+        ...
+
+    @abstractmethod
+    async def materialize_host_stats(self, collection: str, stats_collection: str) -> None:
+        ...
+
+    # The analytics below read the buckets written by `materialize_host_stats` into `collection`.
     @abstractmethod
     async def get_os_distribution(self, collection: str) -> dict[str, int]:
         ...
@@ -51,3 +143,25 @@ class HostNormalizedDataRepository(ABC):
     async def get_open_ports_by_platform_distribution(self, collection: str, ports_list: list[int]) -> dict[
         str, dict[int, int]]:
         ...
+
+
+class PipelineJobRepository(ABC):
+    @abstractmethod
+    async def acquire_lock(self, collection: str, name: str, owner: str, ttl_seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def release_lock(self, collection: str, name: str, owner: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get_lock_owner(self, collection: str, name: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def save_job(self, collection: str, job: PipelineJob) -> None:
+        ...
+
+    @abstractmethod
+    async def get_job(self, collection: str, job_id: str) -> PipelineJob | None:
+        ...
@@ -0,0 +1,136 @@
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+
+
+def intern(value: Any) -> Any:
+    # Values repeated across hosts (platforms, OS versions, service and software names) share one string.
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(frozen=True, slots=True)
+class OpenPortRecord:
+    service_name: str | None
+    port: int
+    protocol: str
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'OpenPortRecord':
+        return cls(intern(document.get('service_name')), document['port'], intern(document['protocol']))
+
+    def to_document(self) -> dict:
+        return {'service_name': self.service_name, 'port': self.port, 'protocol': self.protocol}
+
+
+@dataclass(frozen=True, slots=True)
+class SoftwareRecord:
+    name: str
+    version: str | None
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'SoftwareRecord':
+        return cls(intern(document['name']), intern(document.get('version')))
+
+    def to_document(self) -> dict:
+        return {'name': self.name, 'version': self.version}
+
+
+# Lists of the host fields held as tuples of records.
+RECORD_LISTS = {'open_ports': OpenPortRecord, 'software': SoftwareRecord}
+
+
+def values_from_document(values: dict) -> dict:
+    return {
+        name: tuple(map(RECORD_LISTS[name].from_document, value)) if name in RECORD_LISTS and value else value
+        for name, value in values.items()
+    }
+
+
+def values_to_document(values: dict) -> dict:
+    return {
+        name: [item.to_document() for item in value] if name in RECORD_LISTS and value else value
+        for name, value in values.items()
+    }
+
+
+@dataclass(slots=True)
+class HostRecord:
+    """Compact host used instead of a `HostNormalizedData` model or document where many hosts are held at once:
+    normalized batches on their way to the repository, groups of duplicates read for merging and the in-memory
+    repositories.
+
+    Records are built from documents already validated (or trusted) by the normalizers, or read back from the
+    repository, and turned back into documents at the repository boundary, so they skip validation. Lists are
+    stored as tuples of slotted records and repeated strings are interned.
+    """
+    id: ObjectId | None
+    hostname: str
+    local_ip: str
+    external_ip: str | None = None
+    mac_address: str | None = None
+    provider: str | None = None
+    os_version: str | None = None
+    platform: str | None = None
+    first_seen_at: datetime | None = None
+    last_seen_at: datetime | None = None
+    open_ports_count: int | None = None
+    open_ports: tuple[OpenPortRecord, ...] | None = ()
+    software: tuple[SoftwareRecord, ...] | None = ()
+    vuln_count: int | None = None
+    sources: tuple[str, ...] | None = ()
+    dedup_pending: str | bool | None = None
+    source_values: dict[str, dict[str, Any]] | None = None
+
+    @classmethod
+    def from_document(cls, document: dict, id: ObjectId | None = None,
+                      dedup_pending: str | bool | None = None) -> 'HostRecord':
+        open_ports, software, sources = document.get('open_ports'), document.get('software'), document.get('sources')
+        source_values = document.get('source_values')
+        return cls(
+            id=id if id is not None else document.get('_id'),
+            hostname=document['hostname'],
+            local_ip=document['local_ip'],
+            external_ip=document.get('external_ip'),
+            mac_address=document.get('mac_address'),
+            provider=intern(document.get('provider')),
+            os_version=intern(document.get('os_version')),
+            platform=intern(document.get('platform')),
+            first_seen_at=document.get('first_seen_at'),
+            last_seen_at=document.get('last_seen_at'),
+            open_ports_count=document.get('open_ports_count'),
+            open_ports=None if open_ports is None else tuple(map(OpenPortRecord.from_document, open_ports)),
+            software=None if software is None else tuple(map(SoftwareRecord.from_document, software)),
+            vuln_count=document.get('vuln_count'),
+            sources=None if sources is None else tuple(map(intern, sources)),
+            dedup_pending=dedup_pending if dedup_pending is not None else document.get('dedup_pending'),
+            source_values=None if source_values is None else {
+                source: values_from_document(values) for source, values in source_values.items()
+            },
+        )
+
+    def to_document(self) -> dict:
+        """Return the host laid out like a stored `HostNormalizedData` document."""
+        return {
+            '_id': self.id,
+            'hostname': self.hostname,
+            'local_ip': self.local_ip,
+            'external_ip': self.external_ip,
+            'mac_address': self.mac_address,
+            'provider': self.provider,
+            'os_version': self.os_version,
+            'platform': self.platform,
+            'first_seen_at': self.first_seen_at,
+            'last_seen_at': self.last_seen_at,
+            'open_ports_count': self.open_ports_count,
+            'open_ports': None if self.open_ports is None else [port.to_document() for port in self.open_ports],
+            'software': None if self.software is None else [item.to_document() for item in self.software],
+            'vuln_count': self.vuln_count,
+            'sources': None if self.sources is None else list(self.sources),
+            'source_values': None if self.source_values is None else {
+                source: values_to_document(values) for source, values in self.source_values.items()
+            },
+            **({'dedup_pending': self.dedup_pending} if self.dedup_pending is not None else {}),
+        }
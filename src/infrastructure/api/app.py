@@ -1,12 +1,38 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import Response
 
 from src.infrastructure.api.pipeline.endpoints import router as pipeline_router
+from src.infrastructure.api.pipeline.jobs import pipeline_job_runner
 from src.infrastructure.api.plots.endpoints import router as plots_router
+from src.infrastructure.api.rendering import plot_renderer
+from src.infrastructure.api.stats.endpoints import router as stats_router
+from src.infrastructure.db.mongo.client import mongo_client_lifespan
+from src.infrastructure.metrics import CONTENT_TYPE, render_metrics, setup_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with mongo_client_lifespan():
+        yield
+    plot_renderer.shutdown()
+    pipeline_job_runner.shutdown()
+
 
-app = FastAPI()
+setup_metrics()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(pipeline_router)
 app.include_router(plots_router)
+app.include_router(stats_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose the metrics of this API process in the Prometheus text format, pipeline runs push theirs."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
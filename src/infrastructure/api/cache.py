@@ -0,0 +1,64 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.core.ports.repositories import HostNormalizedDataRepository
+from src.settings import PLOTS_CACHE_MAX_ENTRIES, PLOTS_CACHE_TTL_SECONDS, PLOTS_SOURCE_COLLECTION
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire `ttl_seconds` after they were stored."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_set(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = await factory()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def make_etag(content: bytes) -> str:
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+analytics_cache = TTLCache(max_entries=PLOTS_CACHE_MAX_ENTRIES, ttl_seconds=PLOTS_CACHE_TTL_SECONDS)
+
+
+async def get_cached_analytics(
+        repo: HostNormalizedDataRepository,
+        key: tuple[Hashable, ...],
+        load_data: Callable[[], Awaitable[dict]],
+) -> tuple[dict, str | None]:
+    """Return the analytics for `key` and the data version they belong to, querying Mongo only on a miss.
+
+    Cache keys include the data version bumped by the pipeline, so a finished run invalidates every entry.
+    """
+    version = await repo.get_data_version(PLOTS_SOURCE_COLLECTION)
+    data = await analytics_cache.get_or_set(('data', *key, version), load_data)
+    return data, version
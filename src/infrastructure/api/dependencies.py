@@ -1,7 +1,24 @@
-from src.core.ports.repositories import HostNormalizedDataRepository
+from typing import Literal
+
+from fastapi import Query
+
+from src.core.ports.repositories import HostNormalizedDataRepository, PipelineJobRepository
+from src.infrastructure.api.utils import ImageOptions
 from src.infrastructure.db.mongo.client import get_mongo_client
-from src.infrastructure.db.mongo.repositories import MongoHostNormalizedDataRepository
+from src.infrastructure.db.mongo.repositories import MongoHostNormalizedDataRepository, MongoPipelineJobRepository
 
 
-def get_normal_repository() -> HostNormalizedDataRepository:
+async def get_normal_repository() -> HostNormalizedDataRepository:
     return MongoHostNormalizedDataRepository(client=get_mongo_client())
+
+
+async def get_pipeline_job_repository() -> PipelineJobRepository:
+    return MongoPipelineJobRepository(client=get_mongo_client())
+
+
+def get_image_options(
+        image_format: Literal['png', 'svg'] = Query('png', alias='format'),
+        width: int | None = Query(None, ge=100, le=4000, description='Image width in pixels'),
+        dpi: int = Query(100, ge=30, le=300),
+) -> ImageOptions:
+    return ImageOptions(image_format=image_format, width=width, dpi=dpi)
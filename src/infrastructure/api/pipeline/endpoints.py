@@ -1,16 +1,35 @@
-from fastapi import HTTPException, APIRouter
+from fastapi import HTTPException, APIRouter, Depends
+
+from src.core.entities import PipelineJob
+from src.core.ports.repositories import PipelineJobRepository
+from src.infrastructure.api.dependencies import get_pipeline_job_repository
+from src.infrastructure.api.pipeline.jobs import pipeline_job_runner
+from src.settings import PIPELINE_JOBS_COLLECTION, PIPELINE_LOCK_NAME, PIPELINE_LOCKS_COLLECTION
 
 router = APIRouter(prefix='/pipeline', tags=['pipeline'])
 
 
-@router.get("/execute")
-async def start_pipeline():
-    """Start the pipeline."""
+@router.get("/execute", status_code=202)
+async def start_pipeline(
+        full_resync: bool = False,
+        streaming: bool = False,
+        repo: PipelineJobRepository = Depends(get_pipeline_job_repository),
+):
+    """Start the pipeline in the background and return the id of its job."""
     try:
-        from src.infrastructure.pipeline import fetching_step, normalization_step, deduplication_step
-        fetching_step()
-        normalization_step()
-        deduplication_step()
-        return {"message": "Pipeline executed successfully"}
+        job = await pipeline_job_runner.submit(repo, full_resync=full_resync, streaming=streaming)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error executing pipeline: {str(e)}")
+    if job is None:
+        running_job_id = await repo.get_lock_owner(PIPELINE_LOCKS_COLLECTION, PIPELINE_LOCK_NAME)
+        raise HTTPException(status_code=409, detail=f"Pipeline job {running_job_id} is already running")
+    return {"message": "Pipeline job started", "job_id": job.id}
+
+
+@router.get("/jobs/{job_id}", response_model=PipelineJob)
+async def get_pipeline_job(job_id: str, repo: PipelineJobRepository = Depends(get_pipeline_job_repository)):
+    """Return the status and per-step progress of a pipeline job."""
+    job = await repo.get_job(PIPELINE_JOBS_COLLECTION, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline job {job_id} not found")
+    return job
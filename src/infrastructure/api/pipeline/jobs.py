@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+
+from bson import ObjectId
+
+from src.core.entities import PipelineJob, PipelineJobStep
+from src.core.ports.repositories import PipelineJobRepository
+from src.infrastructure.api.cache import analytics_cache
+from src.infrastructure.pipeline import get_pipeline_steps, run_pipeline_job
+from src.settings import PIPELINE_JOBS_COLLECTION, PIPELINE_LOCK_NAME, PIPELINE_LOCK_TTL_SECONDS, \
+    PIPELINE_LOCKS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineJobRunner:
+    """Start pipeline jobs in a spawned background process, one at a time across every API worker.
+
+    The single-flight lock lives in Mongo, and the job process reports its progress into the jobs collection.
+    """
+
+    def __init__(self):
+        self._executor: ProcessPoolExecutor | None = None
+        self._watchers: set[asyncio.Task] = set()
+
+    async def submit(self, repository: PipelineJobRepository, full_resync: bool = False,
+                     streaming: bool = False) -> PipelineJob | None:
+        """Save and start a new job, or return None when another job holds the pipeline lock."""
+        job = PipelineJob(
+            id=str(ObjectId()),
+            full_resync=full_resync,
+            streaming=streaming,
+            steps=[PipelineJobStep(name=name) for name, _ in get_pipeline_steps(full_resync, streaming)],
+            created_at=datetime.now(),
+        )
+        if not await repository.acquire_lock(PIPELINE_LOCKS_COLLECTION, PIPELINE_LOCK_NAME, job.id,
+                                             PIPELINE_LOCK_TTL_SECONDS):
+            return None
+        try:
+            await repository.save_job(PIPELINE_JOBS_COLLECTION, job)
+            future = self._get_executor().submit(run_pipeline_job, job.id)
+        except BaseException:
+            await repository.release_lock(PIPELINE_LOCKS_COLLECTION, PIPELINE_LOCK_NAME, job.id)
+            raise
+        watcher = asyncio.create_task(self._watch(job.id, future))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+        logger.info(f'Pipeline job {job.id} started')
+        return job
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # A spawned process keeps the pipeline's own forked children out of the uvicorn worker.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    @staticmethod
+    async def _watch(job_id: str, future: Future) -> None:
+        try:
+            await asyncio.wrap_future(future)
+            logger.info(f'Pipeline job {job_id} finished')
+        except Exception as e:
+            logger.error(f'Pipeline job {job_id} failed: {e}')
+        finally:
+            analytics_cache.clear()
+
+
+pipeline_job_runner = PipelineJobRunner()
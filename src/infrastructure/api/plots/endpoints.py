@@ -1,92 +1,166 @@
-from fastapi import HTTPException, Depends, APIRouter
-from fastapi.responses import StreamingResponse
+import io
+from typing import Awaitable, Callable, Hashable
+
+from fastapi import HTTPException, Depends, APIRouter, Request
+from fastapi.responses import Response
 
 from src.core.ports.repositories import HostNormalizedDataRepository
-from src.infrastructure.api.dependencies import get_normal_repository
-from src.infrastructure.api.utils import create_bar_plot, create_pie_plot, create_stacked_bar_plot
+from src.infrastructure.api.cache import analytics_cache, get_cached_analytics, make_etag
+from src.infrastructure.api.dependencies import get_image_options, get_normal_repository
+from src.infrastructure.api.rendering import plot_renderer
+from src.infrastructure.api.utils import ImageOptions, create_bar_plot, create_pie_plot, create_stacked_bar_plot
 from src.settings import PLOTS_SOURCE_COLLECTION
 
 router = APIRouter(prefix='/plots', tags=['plots'])
 
 
-@router.get("/os-distribution", response_class=StreamingResponse)
-async def get_os_distribution_plot(repo: HostNormalizedDataRepository = Depends(get_normal_repository)):
+async def cached_plot_response(
+        request: Request,
+        repo: HostNormalizedDataRepository,
+        options: ImageOptions,
+        key: tuple[Hashable, ...],
+        load_data: Callable[[], Awaitable[dict]],
+        render: Callable[[dict, ImageOptions], io.BytesIO],
+        no_data_detail: str,
+        is_empty: Callable[[dict], bool] = lambda data: not data,
+) -> Response:
+    """Serve a plot from the analytics cache, rerunning the aggregation and the rendering only on a miss."""
+    data, version = await get_cached_analytics(repo, key, load_data)
+    if is_empty(data):
+        raise HTTPException(status_code=404, detail=no_data_detail)
+
+    async def render_plot() -> tuple[bytes, str]:
+        content = await plot_renderer.render(render, data, options)
+        return content, make_etag(content)
+
+    content, etag = await analytics_cache.get_or_set(('image', *key, options, version), render_plot)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=options.media_type, headers=headers)
+
+
+@router.get("/os-distribution", response_class=Response)
+async def get_os_distribution_plot(
+        request: Request,
+        options: ImageOptions = Depends(get_image_options),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
     """Return a bar plot of the operating system distribution."""
     try:
-        data = await repo.get_os_distribution(collection=PLOTS_SOURCE_COLLECTION)
-        if not data:
-            raise HTTPException(status_code=404, detail="No data available for OS distribution")
-
-        buffer = create_bar_plot(
-            data=data,
-            title="Host Distribution by Operating System",
-            x_label="Operating System",
-            y_label="Number of Hosts"
+        return await cached_plot_response(
+            request=request,
+            repo=repo,
+            options=options,
+            key=('os-distribution',),
+            load_data=lambda: repo.get_os_distribution(collection=PLOTS_SOURCE_COLLECTION),
+            render=lambda data, options: create_bar_plot(
+                data=data,
+                title="Host Distribution by Operating System",
+                x_label="Operating System",
+                y_label="Number of Hosts",
+                options=options,
+            ),
+            no_data_detail="No data available for OS distribution",
         )
-        return StreamingResponse(buffer, media_type="image/png")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating plot: {str(e)}")
 
 
-@router.get("/old-vs-new-hosts", response_class=StreamingResponse)
+@router.get("/old-vs-new-hosts", response_class=Response)
 async def get_old_vs_new_hosts_plot(
+        request: Request,
         days_threshold: int = 30,
+        options: ImageOptions = Depends(get_image_options),
         repo: HostNormalizedDataRepository = Depends(get_normal_repository),
 ):
     """Return a pie chart of old vs new hosts."""
     try:
-        data = await repo.get_old_vs_new_hosts(collection=PLOTS_SOURCE_COLLECTION, days_threshold=days_threshold)
-        if not data or sum(data.values()) == 0:
-            raise HTTPException(status_code=404, detail="No data available for old vs new hosts")
-
-        buffer = create_pie_plot(
-            data=data,
-            title=f"Old vs New Hosts (Threshold: {days_threshold} days)"
+        return await cached_plot_response(
+            request=request,
+            repo=repo,
+            options=options,
+            key=('old-vs-new-hosts', days_threshold),
+            load_data=lambda: repo.get_old_vs_new_hosts(
+                collection=PLOTS_SOURCE_COLLECTION,
+                days_threshold=days_threshold,
+            ),
+            render=lambda data, options: create_pie_plot(
+                data=data,
+                title=f"Old vs New Hosts (Threshold: {days_threshold} days)",
+                options=options,
+            ),
+            no_data_detail="No data available for old vs new hosts",
+            is_empty=lambda data: not data or sum(data.values()) == 0,
         )
-        return StreamingResponse(buffer, media_type="image/png")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating plot: {str(e)}")
 
 
-@router.get("/open-ports-distribution", response_class=StreamingResponse)
-async def get_open_ports_distribution_plot(repo: HostNormalizedDataRepository = Depends(get_normal_repository)):
+@router.get("/open-ports-distribution", response_class=Response)
+async def get_open_ports_distribution_plot(
+        request: Request,
+        options: ImageOptions = Depends(get_image_options),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
     """Return a bar plot of the open ports distribution."""
     try:
-        data = await repo.get_open_ports_distribution(collection=PLOTS_SOURCE_COLLECTION)
-        if not data:
-            raise HTTPException(status_code=404, detail="No data available for open ports distribution")
-
-        buffer = create_bar_plot(
-            data=data,
-            title="Open Ports Distribution",
-            x_label="Port Number",
-            y_label="Frequency"
+        return await cached_plot_response(
+            request=request,
+            repo=repo,
+            options=options,
+            key=('open-ports-distribution',),
+            load_data=lambda: repo.get_open_ports_distribution(collection=PLOTS_SOURCE_COLLECTION),
+            render=lambda data, options: create_bar_plot(
+                data=data,
+                title="Open Ports Distribution",
+                x_label="Port Number",
+                y_label="Frequency",
+                options=options,
+            ),
+            no_data_detail="No data available for open ports distribution",
         )
-        return StreamingResponse(buffer, media_type="image/png")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating plot: {str(e)}")
 
 
-@router.get("/open-ports-by-platform-distribution", response_class=StreamingResponse)
+@router.get("/open-ports-by-platform-distribution", response_class=Response)
 async def get_open_ports_by_platform_distribution_plot(
+        request: Request,
         ports: str = "80,443",
+        options: ImageOptions = Depends(get_image_options),
         repo: HostNormalizedDataRepository = Depends(get_normal_repository),
 ):
+    port_list = [int(p) for p in ports.split(",") if p.strip().isdigit()]
+    if not port_list:
+        raise HTTPException(status_code=400, detail="Invalid or empty ports list")
     try:
-        port_list = [int(p) for p in ports.split(",") if p.strip().isdigit()]
-        if not port_list:
-            raise HTTPException(status_code=400, detail="Invalid or empty ports list")
-        data = await repo.get_open_ports_by_platform_distribution(collection=PLOTS_SOURCE_COLLECTION,
-                                                                  ports_list=port_list)
-        if not data:
-            raise HTTPException(status_code=404, detail="No data available for open ports by platform")
-        buffer = create_stacked_bar_plot(
-            data=data,
-            ports=port_list,
-            title=f"Open Ports by Platform (Ports: {', '.join(map(str, port_list))})",
-            x_label="Platform",
-            y_label="Number of Hosts"
+        return await cached_plot_response(
+            request=request,
+            repo=repo,
+            options=options,
+            key=('open-ports-by-platform-distribution', tuple(port_list)),
+            load_data=lambda: repo.get_open_ports_by_platform_distribution(
+                collection=PLOTS_SOURCE_COLLECTION,
+                ports_list=port_list,
+            ),
+            render=lambda data, options: create_stacked_bar_plot(
+                data=data,
+                ports=port_list,
+                title=f"Open Ports by Platform (Ports: {', '.join(map(str, port_list))})",
+                x_label="Platform",
+                y_label="Number of Hosts",
+                options=options,
+            ),
+            no_data_detail="No data available for open ports by platform",
         )
-        return StreamingResponse(buffer, media_type="image/png")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating plot: {str(e)}")
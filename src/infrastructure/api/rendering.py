@@ -0,0 +1,33 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+from src.settings import PLOTS_RENDER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class PlotRenderer:
+    """Run plot renders in a bounded thread pool so a slow render does not block the event loop."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def render(self, create_plot: Callable[..., io.BytesIO], *args, **kwargs) -> bytes:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='plot-renderer')
+        loop = asyncio.get_running_loop()
+        buffer = await loop.run_in_executor(self._executor, partial(create_plot, *args, **kwargs))
+        return buffer.getvalue()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+plot_renderer = PlotRenderer(workers=PLOTS_RENDER_WORKERS)
@@ -0,0 +1,153 @@
+import csv
+import io
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, Literal
+
+import pyarrow as pa
+from fastapi import HTTPException, Depends, APIRouter, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from src.core.ports.repositories import HostNormalizedDataRepository
+from src.infrastructure.api.cache import get_cached_analytics
+from src.infrastructure.api.dependencies import get_normal_repository
+from src.settings import PLOTS_SOURCE_COLLECTION
+
+router = APIRouter(prefix='/stats', tags=['stats'])
+
+OutputFormat = Literal['json', 'csv', 'arrow']
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_BATCH_ROWS = 10_000
+
+
+def drain(buffer: io.StringIO | io.BytesIO) -> str | bytes:
+    """Return what was written to `buffer` since it was last drained."""
+    content = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return content
+
+
+def iter_csv(columns: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([columns], rows):
+        writer.writerow(row)
+        yield drain(buffer)
+
+
+def iter_arrow_ipc(columns: list[str], rows: Iterable[tuple], batch_rows: int = ARROW_BATCH_ROWS) -> Iterator[bytes]:
+    """Yield an Arrow IPC stream of `rows` record batch by record batch, the schema inferred from the first one."""
+    rows = iter(rows)
+    sink = io.BytesIO()
+    writer, schema = None, None
+    while chunk := list(islice(rows, batch_rows)):
+        types = [field.type for field in schema] if schema else [None] * len(columns)
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=value_type) for values, value_type in zip(zip(*chunk), types)],
+            names=columns,
+        )
+        if writer is None:
+            schema = batch.schema
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_batch(batch)
+        yield drain(sink)
+    if writer is None:
+        writer = pa.ipc.new_stream(sink, pa.schema([(column, pa.null()) for column in columns]))
+    writer.close()
+    yield drain(sink)
+
+
+def stats_response(data: Any, columns: list[str], rows: Iterable[tuple], output_format: OutputFormat) -> Response:
+    """Return `data` as compact JSON, or its `rows` streamed as CSV lines or Arrow IPC record batches."""
+    if output_format == 'csv':
+        return StreamingResponse(iter_csv(columns, rows), media_type='text/csv')
+    if output_format == 'arrow':
+        return StreamingResponse(iter_arrow_ipc(columns, rows), media_type=ARROW_MEDIA_TYPE)
+    return JSONResponse(content=data)
+
+
+@router.get("/os-distribution")
+async def get_os_distribution_stats(
+        output_format: OutputFormat = Query('json', alias='format'),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
+    """Return the number of hosts per operating system."""
+    try:
+        data, _ = await get_cached_analytics(
+            repo=repo,
+            key=('os-distribution',),
+            load_data=lambda: repo.get_os_distribution(collection=PLOTS_SOURCE_COLLECTION),
+        )
+        return stats_response(data, ['platform', 'count'], data.items(), output_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing stats: {str(e)}")
+
+
+@router.get("/old-vs-new-hosts")
+async def get_old_vs_new_hosts_stats(
+        days_threshold: int = 30,
+        output_format: OutputFormat = Query('json', alias='format'),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
+    """Return the number of old and new hosts."""
+    try:
+        data, _ = await get_cached_analytics(
+            repo=repo,
+            key=('old-vs-new-hosts', days_threshold),
+            load_data=lambda: repo.get_old_vs_new_hosts(collection=PLOTS_SOURCE_COLLECTION,
+                                                        days_threshold=days_threshold),
+        )
+        return stats_response(data, ['category', 'count'], data.items(), output_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing stats: {str(e)}")
+
+
+@router.get("/open-ports-distribution")
+async def get_open_ports_distribution_stats(
+        output_format: OutputFormat = Query('json', alias='format'),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
+    """Return the number of hosts per open port."""
+    try:
+        data, _ = await get_cached_analytics(
+            repo=repo,
+            key=('open-ports-distribution',),
+            load_data=lambda: repo.get_open_ports_distribution(collection=PLOTS_SOURCE_COLLECTION),
+        )
+        return stats_response(data, ['port', 'count'], data.items(), output_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing stats: {str(e)}")
+
+
+@router.get("/open-ports-by-platform-distribution")
+async def get_open_ports_by_platform_distribution_stats(
+        ports: str = "80,443",
+        output_format: OutputFormat = Query('json', alias='format'),
+        repo: HostNormalizedDataRepository = Depends(get_normal_repository),
+):
+    """Return the number of hosts per platform and open port."""
+    port_list = [int(p) for p in ports.split(",") if p.strip().isdigit()]
+    if not port_list:
+        raise HTTPException(status_code=400, detail="Invalid or empty ports list")
+    try:
+        data, _ = await get_cached_analytics(
+            repo=repo,
+            key=('open-ports-by-platform-distribution', tuple(port_list)),
+            load_data=lambda: repo.get_open_ports_by_platform_distribution(
+                collection=PLOTS_SOURCE_COLLECTION,
+                ports_list=port_list,
+            ),
+        )
+        rows = ((platform, int(port), count) for platform, counts in data.items() for port, count in counts.items())
+        return stats_response(data, ['platform', 'port', 'count'], rows, output_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing stats: {str(e)}")
@@ -1,77 +1,121 @@
 import io
 import logging
+import threading
+from typing import Literal
 
-import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from pydantic import BaseModel, ConfigDict
 
 logger = logging.getLogger(__name__)
 
+# Default figure size in inches of each plot kind; a requested width scales it with the same aspect ratio.
+PLOT_TEMPLATES = {
+    'bar': (10, 6),
+    'pie': (8, 8),
+    'stacked_bar': (12, 6),
+}
 
-def create_bar_plot(data: dict, title: str, x_label: str, y_label: str) -> io.BytesIO:
-    """Generate a bar plot from a dictionary and return it as a BytesIO object."""
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=list(data.keys()), y=list(data.values()))
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-
-    # Save plot to a BytesIO buffer
+MEDIA_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+_thread_figures = threading.local()
+
+
+class ImageOptions(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    image_format: Literal['png', 'svg'] = 'png'
+    width: int | None = None
+    dpi: int = 100
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.image_format]
+
+
+def get_figure(template: str, options: ImageOptions) -> Figure:
+    """Return the calling thread's figure for `template`, cleared and sized for `options`.
+
+    Figures are never shared between threads, so renders running in a thread pool do not need pyplot's global state.
+    """
+    figures = _thread_figures.__dict__.setdefault('figures', {})
+    if (figure := figures.get(template)) is None:
+        figure = figures[template] = Figure()
+        FigureCanvasAgg(figure)
+    figure.clear()
+    width, height = PLOT_TEMPLATES[template]
+    if options.width:
+        width, height = options.width / options.dpi, height * options.width / options.dpi / width
+    figure.set_size_inches(width, height)
+    figure.set_dpi(options.dpi)
+    return figure
+
+
+def save_figure(figure: Figure, options: ImageOptions) -> io.BytesIO:
+    figure.tight_layout()
     buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
+    figure.savefig(buffer, format=options.image_format, dpi=options.dpi)
     buffer.seek(0)
-    plt.close()
     return buffer
 
 
-def create_pie_plot(data: dict[str, int], title: str) -> io.BytesIO:
+def create_bar_plot(data: dict, title: str, x_label: str, y_label: str,
+                    options: ImageOptions = ImageOptions()) -> io.BytesIO:
+    """Generate a bar plot from a dictionary and return it as a BytesIO object."""
+    figure = get_figure('bar', options)
+    ax = figure.subplots()
+    positions = range(len(data))
+    ax.bar(positions, list(data.values()), color=sns.color_palette(n_colors=len(data)))
+    ax.set_xticks(positions, [str(label) for label in data.keys()], rotation=45, ha="right")
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    return save_figure(figure, options)
+
+
+def create_pie_plot(data: dict[str, int], title: str, options: ImageOptions = ImageOptions()) -> io.BytesIO:
     """Generate a pie chart from a dictionary and return it as a BytesIO object."""
-    plt.figure(figsize=(8, 8))
-    plt.pie(
+    figure = get_figure('pie', options)
+    ax = figure.subplots()
+    ax.pie(
         list(data.values()),
         labels=list(data.keys()),
         autopct="%1.1f%%",
         startangle=90,
         colors=sns.color_palette("pastel")
     )
-    plt.title(title)
-    plt.tight_layout()
-
-    # Save plot to a BytesIO buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    plt.close()
-    return buffer
+    ax.set_title(title)
+    return save_figure(figure, options)
 
 
 def create_stacked_bar_plot(data: dict[str, dict[str, int]], ports: list[int], title: str, x_label: str,
-                            y_label: str) -> io.BytesIO:
-    plt.figure(figsize=(12, 6))
+                            y_label: str, options: ImageOptions = ImageOptions()) -> io.BytesIO:
+    figure = get_figure('stacked_bar', options)
+    ax = figure.subplots()
     platforms = list(data.keys())
     port_counts = {port: [data[platform].get(str(port), 0) for platform in platforms] for port in ports}
 
     bottom = None
     for port in ports:
         counts = port_counts[port]
-        plt.bar(platforms, counts, label=f"Port {port}", bottom=bottom)
+        ax.bar(platforms, counts, label=f"Port {port}", bottom=bottom)
         # Add text labels for each stack segment
         for i, (count, platform) in enumerate(zip(counts, platforms)):
             if count > 0:  # Only label non-zero counts
                 height = bottom[i] if bottom is not None else 0
-                plt.text(i, height + count / 2, f"Port {port}: {count}", ha="center", va="center", color="white",
-                         fontsize=10)
+                ax.text(i, height + count / 2, f"Port {port}: {count}", ha="center", va="center", color="white",
+                        fontsize=10)
         bottom = counts if bottom is None else [b + c for b, c in zip(bottom, counts)]
 
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.legend()
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    plt.close()
-    return buffer
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.legend()
+    ax.tick_params(axis="x", labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    return save_figure(figure, options)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import multiprocessing
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+
+from aiohttp import web
+from pydantic import BaseModel, Field
+
+from src.core.ports.api_client import INVALID_SKIP_LIMIT_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+PLATFORMS = ['Linux', 'Windows', 'macOS']
+SERVICES = {22: 'ssh', 80: 'http', 443: 'https', 3389: 'rdp', 5432: 'postgresql', 8080: 'http-alt'}
+SOFTWARE = ['openssl', 'nginx', 'python', 'postgresql', 'chrome', 'office']
+
+
+class SyntheticHostsConfig(BaseModel):
+    """Scale and shape of the hosts served by the fake vendor API, split evenly between the two sources."""
+    hosts: int = Field(ge=1)
+    duplicate_ratio: float = Field(default=0.2, ge=0, le=1)
+    latency: float = Field(default=0.0, ge=0)
+    seed: int = 0
+
+    @property
+    def qualys_hosts(self) -> int:
+        return self.hosts // 2
+
+    @property
+    def crowdstrike_hosts(self) -> int:
+        return self.hosts - self.qualys_hosts
+
+
+def host_identity(index: int) -> dict:
+    return {
+        'hostname': f'host-{index}',
+        'local_ip': f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}',
+        'external_ip': f'54.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}',
+        'mac_address': ':'.join(f'{byte:02x}' for byte in index.to_bytes(6, 'big')),
+    }
+
+
+def qualys_host(index: int, config: SyntheticHostsConfig, now: datetime) -> dict:
+    rng = random.Random(config.seed * 1_000_003 + index)
+    identity = host_identity(index)
+    ports = rng.sample(list(SERVICES), k=rng.randint(0, 4))
+    return {
+        'id': index + 1,
+        'modified': (now - timedelta(days=rng.randint(0, 90))).isoformat(),
+        'sourceInfo': {'list': [{'Ec2AssetSourceSimple': {
+            'localHostname': identity['hostname'],
+            'privateIpAddress': identity['local_ip'],
+            'publicIpAddress': identity['external_ip'],
+            'macAddress': identity['mac_address'],
+        }}]},
+        'cloudProvider': 'AWS',
+        'os': f'{rng.choice(PLATFORMS)} {rng.randint(1, 12)}',
+        'agentInfo': {'platform': rng.choice(PLATFORMS)},
+        'openPort': {'list': [
+            {'HostAssetOpenPort': {'port': port, 'protocol': 'TCP', 'serviceName': SERVICES[port]}} for port in ports
+        ]},
+        'software': {'list': [
+            {'HostAssetSoftware': {'name': name, 'version': f'{rng.randint(1, 9)}.{rng.randint(0, 20)}'}}
+            for name in rng.sample(SOFTWARE, k=rng.randint(0, 3))
+        ]},
+        'vuln': {'list': [{'HostAssetVuln': {'qid': rng.randint(1, 100_000)}} for _ in range(rng.randint(0, 5))]},
+    }
+
+
+def crowdstrike_host(index: int, config: SyntheticHostsConfig, now: datetime) -> dict:
+    rng = random.Random(-(config.seed * 1_000_003 + index + 1))
+    # Duplicates share the deduplication keys of a Qualys host, the rest get identities no Qualys host has.
+    is_duplicate = index < config.qualys_hosts and rng.random() < config.duplicate_ratio
+    identity = host_identity(index if is_duplicate else config.qualys_hosts + index)
+    last_seen = now - timedelta(days=rng.randint(0, 90))
+    return {
+        'device_id': f'{index:032x}',
+        'hostname': identity['hostname'],
+        'local_ip': identity['local_ip'],
+        'external_ip': identity['external_ip'],
+        'mac_address': identity['mac_address'].replace(':', '-'),
+        'service_provider': 'AWS_EC2_V2',
+        'os_version': f'{rng.choice(PLATFORMS)} {rng.randint(1, 12)}',
+        'platform_name': rng.choice(PLATFORMS),
+        'first_seen': (last_seen - timedelta(days=rng.randint(0, 365))).isoformat() + 'Z',
+        'last_seen': last_seen.isoformat() + 'Z',
+    }
+
+
+def create_fake_vendor_app(config: SyntheticHostsConfig) -> web.Application:
+    """Serve the `/api/{source}/hosts/get` endpoints of the vendor API with hosts generated from their offset."""
+    now = datetime.now().replace(microsecond=0)
+    sources = {
+        'qualys': (config.qualys_hosts, qualys_host),
+        'crowdstrike': (config.crowdstrike_hosts, crowdstrike_host),
+    }
+
+    async def get_hosts(request: web.Request) -> web.Response:
+        if request.match_info['source'] not in sources:
+            raise web.HTTPNotFound()
+        total, make_host = sources[request.match_info['source']]
+        skip, limit = int(request.query.get('skip', 0)), int(request.query.get('limit', 1))
+        if config.latency:
+            await asyncio.sleep(config.latency)
+        if skip >= total:
+            return web.Response(status=500, text=INVALID_SKIP_LIMIT_MESSAGE)
+        return web.json_response([make_host(index, config, now) for index in range(skip, min(skip + limit, total))])
+
+    app = web.Application()
+    app.router.add_post('/api/{source}/hosts/get', get_hosts)
+    return app
+
+
+def serve_fake_vendor_api(config: SyntheticHostsConfig, port: int) -> None:
+    web.run_app(create_fake_vendor_app(config), host='127.0.0.1', port=port, print=None)
+
+
+class FakeVendorAPI:
+    """Run the fake vendor API in a separate process, so it does not count towards the benchmark's CPU and RSS."""
+
+    def __init__(self, config: SyntheticHostsConfig, startup_timeout: float = 10.0):
+        self.config = config
+        self.startup_timeout = startup_timeout
+        self.port: int | None = None
+        self._process: multiprocessing.Process | None = None
+
+    def endpoint_url(self, source: str) -> str:
+        return f'http://127.0.0.1:{self.port}/api/{source}/hosts/get'
+
+    def __enter__(self) -> 'FakeVendorAPI':
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self._process = multiprocessing.get_context('spawn').Process(
+            target=serve_fake_vendor_api,
+            args=(self.config, self.port),
+            daemon=True,
+        )
+        self._process.start()
+        self._wait_until_ready()
+        logger.info(f'Fake vendor API serving {self.config.hosts} hosts on port {self.port}')
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        self._process.join()
+
+    def _wait_until_ready(self) -> None:
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.1).close()
+                return
+            except OSError:
+                if time.monotonic() > deadline or not self._process.is_alive():
+                    self._process.terminate()
+                    raise RuntimeError(f'Fake vendor API did not start on port {self.port}')
+                time.sleep(0.05)
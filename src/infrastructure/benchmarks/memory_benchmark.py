@@ -0,0 +1,91 @@
+import gc
+import json
+import logging
+import random
+import tracemalloc
+from typing import Callable
+
+from pydantic import BaseModel, Field
+
+from src.core.entities import HostRawData
+from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig
+from src.infrastructure.benchmarks.normalizer_benchmark import synthetic_raw_data
+from src.infrastructure.dependencies import build_normalizers
+
+logger = logging.getLogger(__name__)
+
+SOFTWARE_CATALOG_SIZE = 500
+
+
+class MemoryBenchmarkConfig(BaseModel):
+    hosts: int = Field(ge=1)
+    # Software entries per Qualys host, picked from a catalog shared by all hosts like real package lists.
+    software: int = Field(default=100, ge=0)
+    seed: int = 0
+
+
+class MemoryResult(BaseModel):
+    representation: str
+    bytes_per_host: float
+    ratio: float
+
+
+def synthetic_qualys_payloads(config: MemoryBenchmarkConfig) -> list[str]:
+    """Qualys hosts with `software` entries each, as JSON so every representation decodes its own strings."""
+    rng = random.Random(config.seed)
+    raw_data = synthetic_raw_data('qualys', SyntheticHostsConfig(hosts=config.hosts, seed=config.seed))
+    payloads = []
+    for data in raw_data:
+        data.data['software'] = {'list': [
+            {'HostAssetSoftware': {'name': f'package-{index}', 'version': f'{index % 7}.{index % 13}'}}
+            for index in rng.sample(range(SOFTWARE_CATALOG_SIZE), k=min(config.software, SOFTWARE_CATALOG_SIZE))
+        ]}
+        payloads.append(json.dumps(data.data))
+    return payloads
+
+
+def measure(build: Callable[[], list]) -> int:
+    """Return the bytes still allocated by the objects `build` returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        started_with = tracemalloc.get_traced_memory()[0]
+        objects = build()
+        allocated = tracemalloc.get_traced_memory()[0] - started_with
+    finally:
+        tracemalloc.stop()
+    del objects
+    return allocated
+
+
+class MemoryBenchmark:
+    """Report the memory kept per Qualys host by its raw data and normalized as a model, a document
+    and a `HostRecord`, the ratio being relative to the model.
+
+    Every representation is built from freshly decoded raw data which is dropped once normalized, so only what
+    the representation keeps alive is counted.
+    """
+
+    def __init__(self, config: MemoryBenchmarkConfig):
+        self.config = config
+
+    def run(self) -> list[MemoryResult]:
+        payloads = synthetic_qualys_payloads(self.config)
+        normalizer = build_normalizers()['qualys']
+
+        def raw(payload: str) -> HostRawData:
+            return HostRawData(source='qualys', data=json.loads(payload))
+
+        representations = {
+            'raw': lambda: [raw(payload) for payload in payloads],
+            'model': lambda: [normalizer.normalize(raw(payload)) for payload in payloads],
+            'document': lambda: [normalizer.normalize_document(raw(payload)) for payload in payloads],
+            'record': lambda: [normalizer.normalize_record(raw(payload)) for payload in payloads],
+        }
+        sizes = {name: measure(build) / len(payloads) for name, build in representations.items()}
+        results = []
+        for name, bytes_per_host in sizes.items():
+            results.append(MemoryResult(representation=name, bytes_per_host=bytes_per_host,
+                                        ratio=bytes_per_host / sizes['model']))
+            logger.info(f'Memory benchmark {name}: {bytes_per_host:.0f} bytes/host')
+        return results
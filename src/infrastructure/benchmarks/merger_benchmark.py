@@ -0,0 +1,133 @@
+import gc
+import logging
+import time
+from typing import Callable
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from src.core.entities import HostNormalizedData, HostUnmergedDataGroup
+from src.core.records import HostRecord
+from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig
+from src.infrastructure.benchmarks.normalizer_benchmark import synthetic_raw_data
+from src.infrastructure.dependencies import build_merger, build_normalizers
+from src.infrastructure.ports.mergers.priority_merger import PrioritySourceMerger
+from src.infrastructure.utils import dig
+from src.settings import PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class MergerResult(BaseModel):
+    merger: str
+    group_size: int
+    seconds: float
+    groups_per_second: float
+    speedup: float
+
+
+def reference_merge(group: HostUnmergedDataGroup, source_priorities: dict) -> HostNormalizedData:
+    """The merge of a single group dumping every document, as `PrioritySourceMerger` did before batching."""
+    merged_doc = dict(group.group_id)
+    merged_doc['sources'] = []
+    ordered_docs = sorted(group.group_docs, key=lambda d: source_priorities.get(dig(d.sources, 0), 0), reverse=True)
+    for doc in ordered_docs:
+        for key, value in doc.to_document().items():
+            # Documents were dumped without their id, which the merged document does not keep.
+            if key != '_id' and key not in merged_doc and value:
+                merged_doc[key] = value
+                merged_doc['sources'].extend(doc.sources)
+    merged_doc['sources'] = list(set(merged_doc['sources']))
+    result_doc = HostNormalizedData(**merged_doc)
+    result_doc.first_seen_at = min((doc.first_seen_at for doc in group.group_docs if doc.first_seen_at), default=None)
+    result_doc.last_seen_at = max((doc.last_seen_at for doc in group.group_docs if doc.last_seen_at), default=None)
+    return result_doc
+
+
+def synthetic_groups(config: SyntheticHostsConfig, group_size: int) -> list[HostUnmergedDataGroup]:
+    """Groups of a Qualys host and its CrowdStrike duplicate, repeated up to `group_size` documents."""
+    normalizers = build_normalizers()
+    unique_keys = PIPELINE_CONFIG['deduplication']['unique_keys']
+    config = config.model_copy(update={'hosts': config.hosts * 2, 'duplicate_ratio': 1.0})
+    sources_docs = [
+        [normalizers[source].normalize(data) for data in synthetic_raw_data(source, config)]
+        for source in ('qualys', 'crowdstrike')
+    ]
+    groups = []
+    for docs in zip(*sources_docs):
+        groups.append(HostUnmergedDataGroup(
+            group_id={field: getattr(docs[0], field) for field in unique_keys},
+            group_docs=[HostRecord.from_document(docs[index % len(docs)].model_dump(), id=ObjectId())
+                        for index in range(group_size)],
+        ))
+    return groups
+
+
+def check_parity(merger: PrioritySourceMerger, groups: list[HostUnmergedDataGroup]) -> None:
+    def comparable(doc: HostNormalizedData) -> dict:
+        # The reference merger orders sources by set iteration and does not keep values by source.
+        return {**doc.model_dump(exclude={'source_values'}), 'sources': sorted(doc.sources)}
+
+    merged_docs = merger.merge_batch(groups)
+    mismatches = sum(
+        comparable(merged_doc) != comparable(reference_merge(group, merger.source_priorities))
+        for group, merged_doc in zip(groups, merged_docs)
+    )
+    if mismatches:
+        raise RuntimeError(f'Batch merge differs from the reference merge on {mismatches} of {len(groups)} groups')
+
+
+class MergerBenchmark:
+    """Compare merging groups one by one by dumping documents with `PrioritySourceMerger.merge_batch`.
+
+    The batch merge is checked against the reference with the default strategies, which take lists by priority,
+    and is also timed with the strategies of the pipeline config.
+    """
+
+    def __init__(self, config: SyntheticHostsConfig, group_sizes: tuple[int, ...] = (2, 8), repeat: int = 3,
+                 batch_size: int | None = None):
+        self.config = config
+        self.group_sizes = group_sizes
+        self.repeat = repeat
+        self.batch_size = batch_size or PIPELINE_CONFIG['deduplication'].get('batch_size', 10)
+
+    def run(self) -> list[MergerResult]:
+        merger = PrioritySourceMerger(source_priorities=PIPELINE_CONFIG['deduplication']['source_priorities'])
+        results = []
+        for group_size in self.group_sizes:
+            groups = synthetic_groups(self.config, group_size)
+            check_parity(merger, groups)
+            batches = [groups[start:start + self.batch_size] for start in range(0, len(groups), self.batch_size)]
+            variants = {
+                'reference': lambda batch: [reference_merge(group, merger.source_priorities) for group in batch],
+                'batch': merger.merge_batch,
+                'batch, configured strategies': build_merger().merge_batch,
+            }
+            baseline = None
+            for name, merge in variants.items():
+                seconds = self._time(merge, batches)
+                baseline = baseline or seconds
+                results.append(MergerResult(
+                    merger=name,
+                    group_size=group_size,
+                    seconds=seconds,
+                    groups_per_second=len(groups) / max(seconds, 1e-9),
+                    speedup=baseline / max(seconds, 1e-9),
+                ))
+                logger.info(f'Merger benchmark {name} by {group_size}: {results[-1].groups_per_second:.0f} groups/s')
+        return results
+
+    def _time(self, merge: Callable[[list[HostUnmergedDataGroup]], list], batches: list[list]) -> float:
+        timings = []
+        for _ in range(self.repeat):
+            # The groups outlive every merge, full collections would keep walking them while timing.
+            gc.collect()
+            gc.freeze()
+            try:
+                started_at = time.perf_counter()
+                for batch in batches:
+                    merge(batch)
+                timings.append(time.perf_counter() - started_at)
+            finally:
+                gc.unfreeze()
+        return min(timings)
@@ -0,0 +1,95 @@
+import logging
+import time
+from datetime import datetime
+from typing import Callable
+
+from pydantic import BaseModel
+
+from src.core.entities import HostRawData
+from src.core.ports.normalizer import Normalizer
+from src.infrastructure.benchmarks.fake_vendor_api import SyntheticHostsConfig, crowdstrike_host, qualys_host
+from src.infrastructure.dependencies import HAND_WRITTEN_NORMALIZERS, get_field_specs
+from src.infrastructure.ports.normalizers.compiled_normalizer import CompiledNormalizer
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_HOSTS = {
+    'qualys': qualys_host,
+    'crowdstrike': crowdstrike_host,
+}
+
+
+class NormalizerResult(BaseModel):
+    source: str
+    normalizer: str
+    seconds: float
+    hosts_per_second: float
+    speedup: float
+
+
+def synthetic_raw_data(source: str, config: SyntheticHostsConfig) -> list[HostRawData]:
+    make_host = SYNTHETIC_HOSTS[source]
+    now = datetime.now().replace(microsecond=0)
+    return [HostRawData(source=source, data=make_host(index, config, now)) for index in range(config.hosts)]
+
+
+def check_parity(reference: Normalizer, normalizer: Normalizer, raw_data: list[HostRawData]) -> None:
+    mismatches = sum(
+        reference.normalize_document(data) != normalizer.normalize_document(data)
+        or reference.normalize(data) != normalizer.normalize(data)
+        for data in raw_data
+    )
+    if mismatches:
+        raise RuntimeError(f'{normalizer.__class__.__name__} differs from {reference.__class__.__name__} '
+                           f'on {mismatches} of {len(raw_data)} hosts')
+
+
+class NormalizerBenchmark:
+    """Compare the hand-written normalizers with the ones compiled from the pipeline config on synthetic hosts.
+
+    Every variant is timed up to the document written to Mongo, so `model_dump` is included when a model is built.
+    The compiled normalizers are checked to produce the same documents before being timed.
+    """
+
+    def __init__(self, config: SyntheticHostsConfig, repeat: int = 3):
+        self.config = config
+        self.repeat = repeat
+
+    def run(self) -> list[NormalizerResult]:
+        results = []
+        for source in SYNTHETIC_HOSTS:
+            raw_data = synthetic_raw_data(source, self.config)
+            reference = HAND_WRITTEN_NORMALIZERS[source]()
+            fields = get_field_specs(source)
+            compiled = CompiledNormalizer(fields)
+            unvalidated = CompiledNormalizer(fields, validate=False)
+            check_parity(reference, compiled, raw_data)
+            check_parity(reference, unvalidated, raw_data)
+
+            variants = {
+                'hand-written': reference.normalize_document,
+                'compiled': compiled.normalize_document,
+                'compiled, not validated': unvalidated.normalize_document,
+            }
+            baseline = None
+            for name, normalize in variants.items():
+                seconds = self._time(normalize, raw_data)
+                baseline = baseline or seconds
+                results.append(NormalizerResult(
+                    source=source,
+                    normalizer=name,
+                    seconds=seconds,
+                    hosts_per_second=len(raw_data) / max(seconds, 1e-9),
+                    speedup=baseline / max(seconds, 1e-9),
+                ))
+                logger.info(f'Normalizer benchmark {source} {name}: {results[-1].hosts_per_second:.0f} hosts/s')
+        return results
+
+    def _time(self, normalize: Callable[[HostRawData], dict], raw_data: list[HostRawData]) -> float:
+        timings = []
+        for _ in range(self.repeat):
+            started_at = time.perf_counter()
+            for data in raw_data:
+                normalize(data)
+            timings.append(time.perf_counter() - started_at)
+        return min(timings)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import re
+import resource
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Literal
+
+from pydantic import BaseModel
+
+from src.application.services.blocking_index import BlockingConfig
+from src.application.services.deduplication_service import DeduplicationService
+from src.application.services.fetching_service import FetchingService
+from src.application.services.normalization_service import NormalizationService
+from src.application.services.stats_service import HostStatsService
+from src.core.ports.api_client import APIClientConfig
+from src.core.ports.repositories import HostNormalizedDataRepository, HostRawDataRepository
+from src.infrastructure.benchmarks.fake_vendor_api import FakeVendorAPI, SyntheticHostsConfig
+from src.infrastructure.db.memory.repositories import (InMemoryDatabase, InMemoryHostNormalizedDataRepository,
+                                                       InMemoryHostRawDataRepository)
+from src.infrastructure.db.mongo.client import mongo_client_lifespan
+from src.infrastructure.db.mongo.repositories import MongoHostNormalizedDataRepository, MongoHostRawDataRepository
+from src.infrastructure.dependencies import NORMALIZERS, build_api_client, build_merger
+from src.settings import DATA_VERSIONS_COLLECTION, MONGODB_DATABASE, PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+Backend = Literal['memory', 'mongo']
+
+BENCHMARK_SOURCES = ('qualys', 'crowdstrike')
+NORMALIZED_COLLECTION = 'benchmark_normalized_data'
+STATS_COLLECTION = 'benchmark_host_stats'
+
+
+def raw_collection(source: str) -> str:
+    return f'benchmark_{source}_raw'
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS of this process to its current RSS, returning False where the kernel does not allow it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb() -> float:
+    """Return the peak RSS of this process since it started or since the last `reset_peak_rss`."""
+    try:
+        with open('/proc/self/status') as f:
+            # VmHWM is the peak that `reset_peak_rss` resets, in KiB.
+            return int(re.search(r'^VmHWM:\s+(\d+)', f.read(), re.MULTILINE).group(1)) / 1024
+    except (OSError, AttributeError):
+        # ru_maxrss is reported in KiB on Linux and is never reset.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageResult(BaseModel):
+    stage: str
+    documents: int | None = None
+    seconds: float
+    hosts_per_second: float
+    peak_rss_mb: float
+
+
+@asynccontextmanager
+async def benchmark_repositories(backend: Backend) -> AsyncIterator[tuple[HostRawDataRepository,
+                                                                             HostNormalizedDataRepository]]:
+    if backend == 'memory':
+        database = InMemoryDatabase()
+        yield InMemoryHostRawDataRepository(database), InMemoryHostNormalizedDataRepository(database)
+        return
+
+    async with mongo_client_lifespan() as client:
+        database = client[MONGODB_DATABASE]
+        collections = [*map(raw_collection, BENCHMARK_SOURCES), NORMALIZED_COLLECTION, STATS_COLLECTION]
+        for collection in collections:
+            await database.drop_collection(collection)
+        for source in BENCHMARK_SOURCES:
+            await database[raw_collection(source)].create_index(
+                f"data.{PIPELINE_CONFIG['fetching']['sources'][source]['id_field']}"
+            )
+            await database[raw_collection(source)].create_index("normalize_pending", sparse=True)
+        await database[NORMALIZED_COLLECTION].create_index("dedup_pending", sparse=True)
+        await database[NORMALIZED_COLLECTION].create_index(
+            [(key, 1) for key in PIPELINE_CONFIG['deduplication']['unique_keys']]
+        )
+        try:
+            yield MongoHostRawDataRepository(client=client), MongoHostNormalizedDataRepository(client=client)
+        finally:
+            for collection in collections:
+                await database.drop_collection(collection)
+            # The stats stage versions its collection like the pipeline does.
+            await database[DATA_VERSIONS_COLLECTION].delete_one({'_id': STATS_COLLECTION})
+
+
+class PipelineBenchmark:
+    """Run fetching, normalization, deduplication and stats against the fake vendor API and report each stage.
+
+    Stages run in this process with the sources handled concurrently on one event loop rather than in forked
+    processes, so the peak RSS covers the whole pipeline. It is reset before every stage on Linux so each stage
+    reports its own peak (including what earlier stages left allocated), elsewhere it is the peak of the run so far.
+    Throughput is the run's hosts over the stage duration.
+    """
+
+    def __init__(self, config: SyntheticHostsConfig, backend: Backend = 'memory', page_size: int = 500,
+                 concurrency: int = 8, stream_parse: bool = False):
+        self.config = config
+        self.backend = backend
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.stream_parse = stream_parse
+
+    def run(self) -> list[StageResult]:
+        with FakeVendorAPI(self.config) as api:
+            return asyncio.run(self._run(api))
+
+    async def _run(self, api: FakeVendorAPI) -> list[StageResult]:
+        normalization_config = PIPELINE_CONFIG['normalization']
+        deduplication_config = PIPELINE_CONFIG['deduplication']
+        async with benchmark_repositories(self.backend) as (raw_repository, normal_repository):
+            fetching_services = [
+                FetchingService(
+                    source=source,
+                    collection=raw_collection(source),
+                    repository=raw_repository,
+                    api_client=build_api_client(APIClientConfig(
+                        slug=source,
+                        api_token='benchmark',
+                        endpoint_url=api.endpoint_url(source),
+                        limit=self.page_size,
+                        concurrency=self.concurrency,
+                        stream_parse=self.stream_parse,
+                    )),
+                    id_field=PIPELINE_CONFIG['fetching']['sources'][source].get('id_field'),
+                )
+                for source in BENCHMARK_SOURCES
+            ]
+            normalization_services = [
+                NormalizationService(
+                    source_collection=raw_collection(source),
+                    target_collection=NORMALIZED_COLLECTION,
+                    normalizer=NORMALIZERS[source],
+                    raw_repository=raw_repository,
+                    normal_repository=normal_repository,
+                    batch_size=normalization_config.get('batch_size', 10),
+                    cursor_batch_size=normalization_config.get('cursor_batch_size'),
+                )
+                for source in BENCHMARK_SOURCES
+            ]
+            deduplication_service = DeduplicationService(
+                collection=NORMALIZED_COLLECTION,
+                normal_repository=normal_repository,
+                merger=build_merger(),
+                blocking=BlockingConfig(**deduplication_config.get('blocking', {})),
+            )
+            stats_service = HostStatsService(
+                source_collection=NORMALIZED_COLLECTION,
+                stats_collection=STATS_COLLECTION,
+                normal_repository=normal_repository,
+            )
+
+            stages = {
+                'fetch': lambda: self._gather(service.fetch_data() for service in fetching_services),
+                'normalize': lambda: self._gather(service.normalize_pending() for service in normalization_services),
+                'dedup': lambda: deduplication_service.deduplicate(
+                    batch_size=deduplication_config.get('batch_size', 10),
+                ),
+                'stats': stats_service.materialize,
+            }
+            return [await self._run_stage(stage, run) for stage, run in stages.items()]
+
+    @staticmethod
+    async def _gather(coroutines) -> int:
+        return sum(await asyncio.gather(*coroutines))
+
+    async def _run_stage(self, stage: str, run: Callable[[], Awaitable[int | None]]) -> StageResult:
+        reset_peak_rss()
+        started_at = time.perf_counter()
+        documents = await run()
+        seconds = time.perf_counter() - started_at
+        result = StageResult(
+            stage=stage,
+            documents=documents,
+            seconds=seconds,
+            hosts_per_second=self.config.hosts / max(seconds, 1e-9),
+            peak_rss_mb=peak_rss_mb(),
+        )
+        logger.info(f'Benchmark stage {stage}: {documents} docs in {seconds:.2f}s '
+                    f'({result.hosts_per_second:.0f} hosts/s, peak RSS {result.peak_rss_mb:.0f} MB)')
+        return result
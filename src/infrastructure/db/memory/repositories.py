@@ -0,0 +1,308 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from typing import Any, AsyncIterator, Iterable
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from src.core.entities import FetchingCheckpoint, HostNormalizedData, HostRawData, HostUnmergedDataGroup
+from src.core.ports.repositories import (FetchingStateRepository, HostRawDataRepository, HostNormalizedDataRepository,
+                                        IdRange)
+from src.core.records import HostRecord
+from src.infrastructure.db.mongo.repositories import content_hash
+from src.settings import DATA_VERSIONS_COLLECTION, PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryDatabase:
+    """Collections of documents keyed by `_id`, standing in for a Mongo database in benchmarks.
+
+    Documents are kept in insertion order, which matches `_id` order since ids are generated by this process.
+    Normalized collections hold `HostRecord`s rather than dicts.
+    """
+
+    def __init__(self):
+        self.collections: dict[str, dict[Any, dict]] = defaultdict(dict)
+
+    def __getitem__(self, collection: str) -> dict[Any, dict]:
+        return self.collections[collection]
+
+    def drop(self, collection: str) -> None:
+        self.collections.pop(collection, None)
+
+
+# Blocking fields as (normalized document field, function computing the value), see `BlockingField`.
+BLOCKING_VALUES = {
+    'hostname': ('hostname', str.lower),
+    'hostname_stem': ('hostname', lambda value: value.split('.', 1)[0].lower()),
+    'local_ip': ('local_ip', lambda value: value),
+    'external_ip': ('external_ip', lambda value: value),
+    'mac_address': ('mac_address', lambda value: value.replace('-', ':').lower()),
+}
+
+
+def in_id_range(document_id: ObjectId, id_range: IdRange | None) -> bool:
+    start, end = id_range or (None, None)
+    return (start is None or document_id >= start) and (end is None or document_id < end)
+
+
+async def iter_batches(documents: Iterable[dict], model: type[BaseModel], batch_size: int) -> AsyncIterator[list]:
+    batch = []
+    for document in documents:
+        batch.append(model(**document))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class InMemoryHostRawDataRepository(HostRawDataRepository):
+    def __init__(self, database: InMemoryDatabase):
+        self.database = database
+        self._ids_by_host_id: dict[tuple[str, str], dict[Any, ObjectId]] = {}
+
+    async def save_raw_data(self, collection: str, documents: list[HostRawData],
+                            normalize_pending: bool = True) -> None:
+        stored = self.database[collection]
+        pending = {'normalize_pending': True} if normalize_pending else {}
+        for document in documents:
+            document_id = ObjectId()
+            stored[document_id] = {'_id': document_id, **document.model_dump(exclude_unset=True), **pending}
+
+    async def upsert_raw_data(self, collection: str, documents: list[HostRawData], id_field: str,
+                              normalize_pending: bool = True) -> None:
+        stored = self.database[collection]
+        pending = {'normalize_pending': True} if normalize_pending else {}
+        # Plays the part of the `data.<id_field>` index, built on first use.
+        if (ids_by_host_id := self._ids_by_host_id.get((collection, id_field))) is None:
+            ids_by_host_id = self._ids_by_host_id[(collection, id_field)] = {
+                document['data'].get(id_field): document_id for document_id, document in stored.items()
+            }
+        for document in documents:
+            document = document.model_copy(update={'content_hash': content_hash(document.data)})
+            host_id = document.data.get(id_field)
+            document_id = ids_by_host_id.get(host_id) if host_id is not None else None
+            if document_id is None:
+                document_id = ObjectId()
+                if host_id is not None:
+                    ids_by_host_id[host_id] = document_id
+            if stored.get(document_id, {}).get('content_hash') != document.content_hash:
+                stored[document_id] = {'_id': document_id, **document.model_dump(), **pending}
+
+    async def get_raw_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            id_range: IdRange | None = None,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+            marker: str | None = None,
+    ) -> AsyncIterator[list[HostRawData]]:
+        # Projections only save network transfer in Mongo, so whole documents are returned.
+        documents = [document for document_id, document in self.database[collection].items()
+                     if in_id_range(document_id, id_range)
+                     and (marker is None or document.get('normalize_pending') == marker)]
+        async for batch in iter_batches(documents, HostRawData, batch_size):
+            yield batch
+
+    async def claim_normalize_pending(self, collection: str) -> str:
+        marker = str(ObjectId())
+        for document in self.database[collection].values():
+            if 'normalize_pending' in document:
+                document['normalize_pending'] = marker
+        return marker
+
+    async def clear_normalize_pending(self, collection: str, marker: str) -> None:
+        for document in self.database[collection].values():
+            if document.get('normalize_pending') == marker:
+                del document['normalize_pending']
+
+    async def get_id_ranges(self, collection: str, partitions: int) -> list[IdRange]:
+        ids = list(self.database[collection])
+        step = max(len(ids) // partitions, 1)
+        boundaries = ids[step::step][:partitions - 1]
+        starts = [None, *boundaries]
+        return list(zip(starts, [*boundaries, None]))
+
+
+class InMemoryFetchingStateRepository(FetchingStateRepository):
+    def __init__(self, database: InMemoryDatabase):
+        self.database = database
+
+    async def get_checkpoint(self, collection: str, source: str) -> FetchingCheckpoint | None:
+        document = self.database[collection].get(source)
+        return FetchingCheckpoint(**document) if document else None
+
+    async def save_checkpoint(self, collection: str, checkpoint: FetchingCheckpoint) -> None:
+        self.database[collection][checkpoint.source] = checkpoint.model_dump()
+
+
+class InMemoryHostNormalizedDataRepository(HostNormalizedDataRepository):
+    def __init__(self, database: InMemoryDatabase):
+        self.database = database
+
+    async def get_normalized_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+    ) -> AsyncIterator[list[HostNormalizedData]]:
+        documents = [record.to_document() for record in self.database[collection].values()]
+        async for batch in iter_batches(documents, HostNormalizedData, batch_size):
+            yield batch
+
+    async def save_normalized_data(self, collection: str, documents: list[HostNormalizedData],
+                                   dedup_pending: bool = True) -> None:
+        await self.save_normalized_records(collection, [HostRecord.from_document(document.model_dump())
+                                                        for document in documents], dedup_pending=dedup_pending)
+
+    async def save_normalized_records(self, collection: str, records: list[HostRecord],
+                                      dedup_pending: bool = True) -> None:
+        # The records are stored as they are, like Mongo's insert_many setting the `_id` of inserted documents.
+        stored = self.database[collection]
+        pending = True if dedup_pending else None
+        for record in records:
+            record.id, record.dedup_pending = ObjectId(), pending
+            stored[record.id] = record
+
+    async def delete_normalized_data_by_ids(self, collection: str, ids: list[str]) -> None:
+        stored = self.database[collection]
+        for document_id in ids:
+            stored.pop(ObjectId(document_id), None)
+
+    async def get_unmerged_docs_groups(self, collection: str, batch_size: int = 10, marker: str | None = None) -> \
+            AsyncIterator[list[HostUnmergedDataGroup]]:
+        unique_keys = PIPELINE_CONFIG['deduplication']['unique_keys']
+        stored = self.database[collection]
+        groups = defaultdict(list)
+        for document_id, record in stored.items():
+            groups[tuple(getattr(record, field) for field in unique_keys)].append(document_id)
+        if marker is not None:
+            touched = {tuple(getattr(record, field) for field in unique_keys)
+                       for record in stored.values() if record.dedup_pending == marker}
+            groups = {key: ids for key, ids in groups.items() if key in touched}
+
+        duplicates = [(key, ids) for key, ids in groups.items() if len(ids) > 1]
+        for start in range(0, len(duplicates), batch_size):
+            yield [
+                HostUnmergedDataGroup(
+                    group_id=dict(zip(unique_keys, key)),
+                    group_docs=[stored[document_id] for document_id in ids if document_id in stored],
+                )
+                for key, ids in duplicates[start:start + batch_size]
+            ]
+
+    async def get_blocks(self, collection: str, key: list[str], max_block_size: int, marker: str | None = None) -> \
+            AsyncIterator[list[ObjectId]]:
+        fields = [BLOCKING_VALUES[name] for name in key]
+        blocks = defaultdict(list)
+        pending = set()
+        for document_id, record in self.database[collection].items():
+            values = [getattr(record, field) for field, _ in fields]
+            if not all(isinstance(value, str) and value for value in values):
+                continue
+            block_key = tuple(normalize(value) for value, (_, normalize) in zip(values, fields))
+            blocks[block_key].append(document_id)
+            if marker is not None and record.dedup_pending == marker:
+                pending.add(block_key)
+        for block_key, ids in blocks.items():
+            if 1 < len(ids) <= max_block_size and (marker is None or block_key in pending):
+                yield ids
+
+    async def get_docs_groups(self, collection: str, clusters: list[list[ObjectId]]) -> list[HostUnmergedDataGroup]:
+        stored = self.database[collection]
+        return [
+            HostUnmergedDataGroup(group_id={}, group_docs=[stored[document_id] for document_id in ids
+                                                           if document_id in stored])
+            for ids in clusters
+        ]
+
+    async def commit_merges(self, collection: str, merges: list[tuple[list[str], HostNormalizedData]],
+                            transactional: bool = False) -> None:
+        stored = self.database[collection]
+        for ids, merged_doc in merges:
+            survivor_id, *duplicate_ids = [ObjectId(x) for x in ids]
+            stored[survivor_id] = HostRecord.from_document(merged_doc.model_dump(), id=survivor_id)
+            for duplicate_id in duplicate_ids:
+                stored.pop(duplicate_id, None)
+
+    async def claim_dedup_pending(self, collection: str) -> str:
+        marker = str(ObjectId())
+        for record in self.database[collection].values():
+            if record.dedup_pending is not None:
+                record.dedup_pending = marker
+        return marker
+
+    async def clear_dedup_pending(self, collection: str, marker: str) -> None:
+        for record in self.database[collection].values():
+            if record.dedup_pending == marker:
+                record.dedup_pending = None
+
+    async def get_data_version(self, collection: str) -> str | None:
+        document = self.database[DATA_VERSIONS_COLLECTION].get(collection)
+        return document['version'] if document else None
+
+    async def bump_data_version(self, collection: str) -> str:
+        version = str(ObjectId())
+        self.database[DATA_VERSIONS_COLLECTION][collection] = {'version': version, 'updated_at': datetime.now()}
+        return version
+
+    async def materialize_host_stats(self, collection: str, stats_collection: str) -> None:
+        platforms, platform_ports, ports, days = Counter(), Counter(), Counter(), Counter()
+        for record in self.database[collection].values():
+            platform = record.platform
+            if platform is not None:
+                platforms[platform] += 1
+            for port in {open_port.port for open_port in record.open_ports or ()}:
+                platform_ports[(platform, port)] += 1
+                ports[port] += 1
+            if isinstance(last_seen_at := record.last_seen_at, datetime):
+                days[datetime.combine(last_seen_at.date(), time.min)] += 1
+
+        buckets = [
+            *({'kind': 'platform', 'platform': platform, 'count': count} for platform, count in platforms.items()),
+            *({'kind': 'platform_port', 'platform': platform, 'port': port, 'count': count}
+              for (platform, port), count in platform_ports.items()),
+            *({'kind': 'port', 'port': port, 'count': count} for port, count in ports.items()),
+            *({'kind': 'last_seen_day', 'day': day, 'count': count} for day, count in days.items()),
+        ]
+        self.database.drop(stats_collection)
+        stored = self.database[stats_collection]
+        for bucket in buckets:
+            bucket_id = ObjectId()
+            stored[bucket_id] = {'_id': bucket_id, **bucket}
+
+    def _get_buckets(self, collection: str, kind: str) -> list[dict]:
+        return [bucket for bucket in self.database[collection].values() if bucket['kind'] == kind]
+
+    async def get_os_distribution(self, collection: str) -> dict[str, int]:
+        buckets = sorted(self._get_buckets(collection, 'platform'), key=lambda bucket: -bucket['count'])
+        return {bucket['platform']: bucket['count'] for bucket in buckets}
+
+    async def get_old_vs_new_hosts(self, collection: str, days_threshold: int = 30) -> dict[str, int]:
+        threshold_date = datetime.now() - timedelta(days=days_threshold)
+        threshold_day = datetime.combine(threshold_date.date(), time.min)
+        distribution = {"old": 0, "new": 0}
+        for bucket in self._get_buckets(collection, 'last_seen_day'):
+            distribution["old" if bucket['day'] < threshold_day else "new"] += bucket['count']
+        return distribution
+
+    async def get_open_ports_distribution(self, collection: str) -> dict[int, int]:
+        buckets = sorted(self._get_buckets(collection, 'port'), key=lambda bucket: bucket['port'])
+        return {bucket['port']: bucket['count'] for bucket in buckets}
+
+    async def get_open_ports_by_platform_distribution(self, collection: str, ports_list: list[int]) -> dict[
+        str, dict[str, int]]:
+        buckets = sorted(
+            (bucket for bucket in self._get_buckets(collection, 'platform_port')
+             if bucket['platform'] is not None and bucket['port'] in ports_list),
+            key=lambda bucket: (bucket['platform'], bucket['port']),
+        )
+        result = {}
+        for bucket in buckets:
+            result.setdefault(bucket['platform'], {})[str(bucket['port'])] = bucket['count']
+        return result
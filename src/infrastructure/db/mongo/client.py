@@ -1,7 +1,83 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from pymongo import AsyncMongoClient
 
-from src.settings import MONGODB_URL
+from src.infrastructure.db.mongo.monitoring import CommandMetricsListener
+from src.settings import METRICS_ENABLED, MONGODB_CLIENT_OPTIONS, MONGODB_URL
+
+logger = logging.getLogger(__name__)
+
+_client: AsyncMongoClient | None = None
+_client_pid: int | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _is_client_usable(loop: asyncio.AbstractEventLoop | None) -> bool:
+    return _client is not None and _client_pid == os.getpid() and (loop is None or _client_loop in (None, loop))
+
+
+def _create_client() -> AsyncMongoClient:
+    return AsyncMongoClient(
+        MONGODB_URL,
+        event_listeners=[CommandMetricsListener()] if METRICS_ENABLED else [],
+        **MONGODB_CLIENT_OPTIONS,
+    )
 
 
 def get_mongo_client() -> AsyncMongoClient:
-    return AsyncMongoClient(MONGODB_URL)
+    """Return the pooled client of the current process.
+
+    A new client is created after a fork (e.g. in `run_parallel` workers) and when the previous client is bound
+    to another event loop, because pymongo clients can be shared neither across processes nor across loops.
+    """
+    global _client, _client_pid, _client_loop
+    loop = _get_running_loop()
+    if _is_client_usable(loop):
+        _client_loop = _client_loop or loop
+        return _client
+
+    logger.debug(f'Creating mongo client for process {os.getpid()}')
+    _client = _create_client()
+    _client_pid = os.getpid()
+    _client_loop = loop
+    return _client
+
+
+async def close_mongo_client() -> None:
+    global _client, _client_pid, _client_loop
+    if _client is not None and _client_pid == os.getpid():
+        await _client.close()
+    _client, _client_pid, _client_loop = None, None, None
+
+
+@asynccontextmanager
+async def mongo_client_lifespan() -> AsyncIterator[AsyncMongoClient]:
+    """Provide the process client and close it on exit, unless it was already opened by an outer lifespan."""
+    owns_client = not _is_client_usable(_get_running_loop())
+    try:
+        yield get_mongo_client()
+    finally:
+        if owns_client:
+            await close_mongo_client()
+
+
+@asynccontextmanager
+async def dedicated_mongo_client() -> AsyncIterator[AsyncMongoClient]:
+    """Provide a client of its own, closed on exit, e.g. to a thread running its own event loop besides the process
+    client's, which must not replace or close that client."""
+    client = _create_client()
+    try:
+        yield client
+    finally:
+        await client.close()
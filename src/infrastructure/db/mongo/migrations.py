@@ -1,6 +1,6 @@
 from pymongo import AsyncMongoClient
 
-from src.settings import MONGODB_DATABASE
+from src.settings import MONGODB_DATABASE, PIPELINE_CONFIG
 
 
 async def create_indexes(client: AsyncMongoClient):
@@ -9,3 +9,11 @@ async def create_indexes(client: AsyncMongoClient):
     await collection.create_index("platform")
     await collection.create_index("last_seen_at")
     await collection.create_index("open_ports.port")
+    await collection.create_index("dedup_pending", sparse=True)
+    await collection.create_index([(key, 1) for key in PIPELINE_CONFIG['deduplication']['unique_keys']])
+    await database[PIPELINE_CONFIG['stats']['collection']].create_index("kind")
+
+    for source_config in PIPELINE_CONFIG['fetching']['sources'].values():
+        await database[source_config['target_collection']].create_index("normalize_pending", sparse=True)
+        if id_field := source_config.get('id_field'):
+            await database[source_config['target_collection']].create_index(f'data.{id_field}')
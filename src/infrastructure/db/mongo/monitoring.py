@@ -0,0 +1,25 @@
+from pymongo.monitoring import CommandFailedEvent, CommandListener, CommandStartedEvent, CommandSucceededEvent
+
+from src.core.ports.metrics import get_metrics
+
+
+class CommandMetricsListener(CommandListener):
+    """Record the round trip time of every Mongo command, labelled by command and collection."""
+
+    def __init__(self):
+        self._collections: dict[int, str] = {}
+
+    def started(self, event: CommandStartedEvent) -> None:
+        # Most commands name their collection in their first field, getMore names it in `collection`.
+        collection = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ''
+
+    def succeeded(self, event: CommandSucceededEvent) -> None:
+        get_metrics().observe('mongo_command_duration_seconds', event.duration_micros / 1e6,
+                              command=event.command_name, collection=self._collections.pop(event.request_id, ''))
+
+    def failed(self, event: CommandFailedEvent) -> None:
+        collection = self._collections.pop(event.request_id, '')
+        get_metrics().observe('mongo_command_duration_seconds', event.duration_micros / 1e6,
+                              command=event.command_name, collection=collection)
+        get_metrics().increment('mongo_command_failures_total', command=event.command_name, collection=collection)
@@ -1,49 +1,176 @@
+import hashlib
+import json
 import logging
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, time
 from typing import AsyncIterator
 
 from bson import ObjectId
-from pymongo import AsyncMongoClient
+from pymongo import AsyncMongoClient, DeleteMany, InsertOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.asynchronous.collection import AsyncCollection
 
-from src.core.entities import HostNormalizedData, HostRawData, HostUnmergedDataGroup
-from src.core.ports.repositories import HostRawDataRepository, HostNormalizedDataRepository
-from src.settings import MONGODB_DATABASE, PIPELINE_CONFIG
+from src.core.entities import (FetchingCheckpoint, HostNormalizedData, HostRawData, HostUnmergedDataGroup,
+                               PipelineJob)
+from src.core.ports.repositories import (FetchingStateRepository, HostRawDataRepository, HostNormalizedDataRepository,
+                                        IdRange, PipelineJobRepository)
+from src.core.records import HostRecord
+from src.settings import DATA_VERSIONS_COLLECTION, MONGODB_DATABASE, PIPELINE_CONFIG
 
 logger = logging.getLogger(__name__)
 
+DEDUP_KEYS_CHUNK_SIZE = 1000
+
+# Blocking fields as (normalized document field, expression computing the value), see `BlockingField`.
+BLOCKING_EXPRESSIONS = {
+    'hostname': ('hostname', {"$toLower": "$hostname"}),
+    'hostname_stem': ('hostname', {"$toLower": {"$arrayElemAt": [{"$split": ["$hostname", "."]}, 0]}}),
+    'local_ip': ('local_ip', "$local_ip"),
+    'external_ip': ('external_ip', "$external_ip"),
+    'mac_address': ('mac_address', {"$toLower": {"$replaceAll": {"input": "$mac_address", "find": "-",
+                                                                "replacement": ":"}}}),
+}
+
+
+def stats_bucket(kind: str, run_id: str, **fields: str) -> dict:
+    """Stage shaping grouped `count`s into host_stats buckets keyed by kind and fields."""
+    key = {"kind": kind, **fields}
+    return {"$replaceWith": {"_id": key, **key, "count": "$count", "run_id": run_id}}
+
+
+def content_hash(data: dict) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
 
 class MongoHostRawDataRepository(HostRawDataRepository):
     def __init__(self, client: AsyncMongoClient):
         self.client = client
         self.database = client[MONGODB_DATABASE]
 
-    async def save_raw_data(self, collection: str, documents: list[HostRawData]) -> None:
+    async def save_raw_data(self, collection: str, documents: list[HostRawData],
+                            normalize_pending: bool = True) -> None:
         logger.info(f'Saving {len(documents)} documents to {collection}')
-        await self.database[collection].insert_many([document.model_dump(exclude_unset=True) for document in documents])
+        pending = {'normalize_pending': True} if normalize_pending else {}
+        await self.database[collection].insert_many([
+            {**document.model_dump(exclude_unset=True), **pending} for document in documents
+        ])
+
+    async def upsert_raw_data(self, collection: str, documents: list[HostRawData], id_field: str,
+                              normalize_pending: bool = True) -> None:
+        key = f'data.{id_field}'
+        pending = {'normalize_pending': True} if normalize_pending else {}
+        documents_by_id = {}
+        operations = []
+        for document in documents:
+            document = document.model_copy(update={'content_hash': content_hash(document.data)})
+            if (host_id := document.data.get(id_field)) is None:
+                operations.append(InsertOne({**document.model_dump(), **pending}))
+            else:
+                documents_by_id[host_id] = document
+
+        stored_hashes = {}
+        if documents_by_id:
+            cursor = self.database[collection].find({key: {'$in': list(documents_by_id)}}, {key: 1, 'content_hash': 1})
+            async for stored in cursor:
+                stored_hashes[stored['data'][id_field]] = stored.get('content_hash')
+
+        for host_id, document in documents_by_id.items():
+            if stored_hashes.get(host_id) != document.content_hash:
+                operations.append(ReplaceOne({key: host_id}, {**document.model_dump(), **pending}, upsert=True))
+
+        logger.info(f'Upserting {len(operations)} of {len(documents)} documents to {collection}')
+        if operations:
+            await self.database[collection].bulk_write(operations, ordered=False)
+
+    async def get_raw_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            id_range: IdRange | None = None,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+            marker: str | None = None,
+    ) -> AsyncIterator[list[HostRawData]]:
+        start, end = id_range or (None, None)
+        id_filter = {**({'$gte': start} if start is not None else {}), **({'$lt': end} if end is not None else {})}
+        cursor = self.database[collection].find(
+            {**({'_id': id_filter} if id_filter else {}), **({'normalize_pending': marker} if marker else {})},
+            {'source': 1, **{field: 1 for field in projection}} if projection else None,
+        ).sort('_id', 1).batch_size(cursor_batch_size or batch_size)
 
-    async def get_raw_data(self, collection: str, batch_size: int = 10) -> AsyncIterator[list[HostRawData]]:
         batch = []
-        async for document in self.database[collection].find():
+        async for document in cursor:
             batch.append(HostRawData(**document))
             if len(batch) >= batch_size:
-                logger.info(f'Fetched {len(batch)} documents from {collection}')
+                logger.debug(f'Fetched {len(batch)} documents from {collection}')
                 yield batch
                 batch = []
         if batch:
-            logger.info(f'Fetched {len(batch)} documents from {collection}')
+            logger.debug(f'Fetched {len(batch)} documents from {collection}')
             yield batch
 
+    async def claim_normalize_pending(self, collection: str) -> str:
+        marker = str(ObjectId())
+        # Documents left with a marker by an interrupted run are claimed again.
+        result = await self.database[collection].update_many(
+            {"normalize_pending": {"$exists": True}},
+            {"$set": {"normalize_pending": marker}},
+        )
+        logger.info(f'Claimed {result.modified_count} documents pending normalization in {collection}')
+        return marker
+
+    async def clear_normalize_pending(self, collection: str, marker: str) -> None:
+        await self.database[collection].update_many(
+            {"normalize_pending": marker},
+            {"$unset": {"normalize_pending": ""}},
+        )
+
+    async def get_id_ranges(self, collection: str, partitions: int) -> list[IdRange]:
+        cursor = await self.database[collection].aggregate(
+            [{'$bucketAuto': {'groupBy': '$_id', 'buckets': partitions}}],
+            allowDiskUse=True,
+        )
+        boundaries = [bucket['_id']['min'] async for bucket in cursor][1:]
+        starts = [None, *boundaries]
+        return list(zip(starts, [*boundaries, None]))
+
+
+class MongoFetchingStateRepository(FetchingStateRepository):
+    def __init__(self, client: AsyncMongoClient):
+        self.client = client
+        self.database = client[MONGODB_DATABASE]
+
+    async def get_checkpoint(self, collection: str, source: str) -> FetchingCheckpoint | None:
+        document = await self.database[collection].find_one({'_id': source})
+        return FetchingCheckpoint(**document) if document else None
+
+    async def save_checkpoint(self, collection: str, checkpoint: FetchingCheckpoint) -> None:
+        logger.debug(f'Saving checkpoint for {checkpoint.source} to {collection}')
+        await self.database[collection].replace_one(
+            {'_id': checkpoint.source},
+            checkpoint.model_dump(),
+            upsert=True,
+        )
+
 
 class MongoHostNormalizedDataRepository(HostNormalizedDataRepository):
     def __init__(self, client: AsyncMongoClient):
         self.client = client
         self.database = client[MONGODB_DATABASE]
 
-    async def get_normalized_data(self, collection: str, batch_size: int = 10) -> AsyncIterator[
-        list[HostNormalizedData]]:
+    async def get_normalized_data(
+            self,
+            collection: str,
+            batch_size: int = 10,
+            cursor_batch_size: int | None = None,
+            projection: list[str] | None = None,
+    ) -> AsyncIterator[list[HostNormalizedData]]:
+        cursor = self.database[collection].find(
+            {},
+            {field: 1 for field in projection} if projection else None,
+        ).sort('_id', 1).batch_size(cursor_batch_size or batch_size)
+
         batch = []
-        async for document in self.database[collection].find():
-            logger.info(document)
+        async for document in cursor:
             batch.append(HostNormalizedData(**document))
             if len(batch) >= batch_size:
                 logger.debug(f'Fetched {len(batch)} documents from {collection}')
@@ -53,157 +180,285 @@ class MongoHostNormalizedDataRepository(HostNormalizedDataRepository):
             logger.debug(f'Fetched {len(batch)} documents from {collection}')
             yield batch
 
-    async def save_normalized_data(self, collection: str, documents: list[HostNormalizedData]) -> None:
-        logger.debug(f'Saving {len(documents)} documents to {collection}')
-        await self.database[collection].insert_many([document.model_dump() for document in documents])
+    async def save_normalized_data(self, collection: str, documents: list[HostNormalizedData],
+                                   dedup_pending: bool = True) -> None:
+        await self.save_normalized_records(collection, [HostRecord.from_document(document.model_dump())
+                                                        for document in documents], dedup_pending=dedup_pending)
+
+    async def save_normalized_records(self, collection: str, records: list[HostRecord],
+                                      dedup_pending: bool = True) -> None:
+        logger.debug(f'Saving {len(records)} documents to {collection}')
+        documents = []
+        for record in records:
+            document = record.to_document()
+            if document['_id'] is None:
+                del document['_id']
+            if dedup_pending:
+                document['dedup_pending'] = True
+            documents.append(document)
+        await self.database[collection].insert_many(documents)
 
     async def delete_normalized_data_by_ids(self, collection: str, ids: list[str]) -> None:
         logger.debug(f'Deleting {len(ids)} documents from {collection}')
         delete_result = await self.database[collection].delete_many({'_id': {'$in': [ObjectId(x) for x in ids]}})
         logger.debug(f'Deleted {delete_result.deleted_count} documents from {collection}')
 
-    async def get_unmerged_docs_groups(self, collection: str, batch_size: int = 10) -> AsyncIterator[
+    async def get_unmerged_docs_groups(self, collection: str, batch_size: int = 10, marker: str | None = None) -> \
+            AsyncIterator[list[HostUnmergedDataGroup]]:
+        unique_keys = PIPELINE_CONFIG['deduplication']['unique_keys']
+        if marker is None:
+            async for batch in self._group_docs(collection, batch_size):
+                yield batch
+            return
+
+        # Only the groups touched by documents claimed with the marker are regrouped.
+        cursor = await self.database[collection].aggregate([
+            {"$match": {"dedup_pending": marker}},
+            {"$group": {"_id": {field: f"${field}" for field in unique_keys}}},
+        ])
+        keys = []
+        async for group in cursor:
+            keys.append({field: group['_id'].get(field) for field in unique_keys})
+            if len(keys) >= DEDUP_KEYS_CHUNK_SIZE:
+                async for batch in self._group_docs(collection, batch_size, {"$or": keys}):
+                    yield batch
+                keys = []
+        if keys:
+            async for batch in self._group_docs(collection, batch_size, {"$or": keys}):
+                yield batch
+
+    async def _group_docs(self, collection: str, batch_size: int, match: dict | None = None) -> AsyncIterator[
         list[HostUnmergedDataGroup]]:
+        # Only the ids are grouped on the server, the documents of a batch of groups are fetched with one query.
         pipeline = [
             {"$group": {
                 "_id": {field: f"${field}" for field in PIPELINE_CONFIG['deduplication']['unique_keys']},
-                "docs": {"$push": "$$ROOT"},
                 "ids": {"$push": "$_id"},
                 "count": {"$sum": 1}
             }},
-            {"$match": {"count": {"$gt": 0}}}
+            {"$match": {"count": {"$gt": 1}}}
         ]
-        cursor = await self.database[collection].aggregate(pipeline)
+        if match:
+            pipeline.insert(0, {"$match": match})
+        cursor = await self.database[collection].aggregate(pipeline, allowDiskUse=True)
 
-        batch = []
+        groups = []
         async for group in cursor:
-            batch.append(HostUnmergedDataGroup(group_id=group['_id'], group_docs=group['docs']))
-            if len(batch) >= batch_size:
-                logger.debug(f'Fetched {len(batch)} groups from {collection}')
-                yield batch
-                batch = []
-        if batch:
-            logger.debug(f'Fetched {len(batch)} groups from {collection}')
-            yield batch
+            groups.append(group)
+            if len(groups) >= batch_size:
+                yield await self._fetch_groups_docs(collection, groups)
+                groups = []
+        if groups:
+            yield await self._fetch_groups_docs(collection, groups)
 
-    async def get_os_distribution(self, collection: str) -> dict[str, int]:
-        pipeline = [
-            {"$group": {"_id": "$platform", "count": {"$sum": 1}}},
-            {"$match": {"_id": {"$ne": None}}},
-            {"$sort": {"count": -1}},
-            {"$project": {"platform": "$_id", "count": 1, "_id": 0}}
+    async def get_blocks(self, collection: str, key: list[str], max_block_size: int, marker: str | None = None) -> \
+            AsyncIterator[list[ObjectId]]:
+        fields = [BLOCKING_EXPRESSIONS[name] for name in key]
+        group = {
+            "_id": {name: expression for name, (_, expression) in zip(key, fields)},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }
+        block_match = {"count": {"$gt": 1, "$lte": max_block_size}}
+        if marker is not None:
+            # Blocks without claimed documents were already merged by previous runs.
+            group["pending"] = {"$max": {"$eq": ["$dedup_pending", marker]}}
+            block_match["pending"] = True
+        cursor = await self.database[collection].aggregate([
+            {"$match": {field: {"$type": "string", "$ne": ""} for field, _ in fields}},
+            {"$group": group},
+            {"$match": block_match},
+            {"$project": {"ids": 1}},
+        ], allowDiskUse=True)
+        async for block in cursor:
+            yield block['ids']
+
+    async def get_docs_groups(self, collection: str, clusters: list[list[ObjectId]]) -> list[HostUnmergedDataGroup]:
+        # Clusters have no common key, the merger takes every field from the documents by source priority.
+        return await self._fetch_groups_docs(collection, [{'_id': {}, 'ids': ids} for ids in clusters])
+
+    async def _fetch_groups_docs(self, collection: str, groups: list[dict]) -> list[HostUnmergedDataGroup]:
+        ids = [doc_id for group in groups for doc_id in group['ids']]
+        docs = {doc['_id']: doc async for doc in self.database[collection].find({'_id': {'$in': ids}})}
+        logger.debug(f'Fetched {len(groups)} groups from {collection}')
+        return [
+            HostUnmergedDataGroup(
+                group_id=group['_id'],
+                group_docs=[HostRecord.from_document(docs[doc_id]) for doc_id in group['ids'] if doc_id in docs],
+            )
+            for group in groups
         ]
-        cursor = await self.database[collection].aggregate(pipeline)
+
+    async def commit_merges(self, collection: str, merges: list[tuple[list[str], HostNormalizedData]],
+                            transactional: bool = False) -> None:
+        """Replace the first document of every group with the merged one and delete the rest in one bulk_write.
+
+        The surviving document is never deleted, so a partially applied batch can leave duplicates for the next
+        run but never loses a host. With `transactional` the whole batch is applied atomically.
+        """
+        operations = []
+        for ids, merged_doc in merges:
+            survivor_id, *duplicate_ids = [ObjectId(x) for x in ids]
+            operations.append(ReplaceOne({'_id': survivor_id}, merged_doc.model_dump(), upsert=True))
+            if duplicate_ids:
+                operations.append(DeleteMany({'_id': {'$in': duplicate_ids}}))
+        if not operations:
+            return
+
+        logger.debug(f'Committing {len(merges)} merged groups to {collection}')
+        if not transactional:
+            await self.database[collection].bulk_write(operations, ordered=False)
+            return
+
+        async def commit(session):
+            await self.database[collection].bulk_write(operations, ordered=False, session=session)
+
+        async with self.client.start_session() as session:
+            await session.with_transaction(commit)
+
+    async def claim_dedup_pending(self, collection: str) -> str:
+        marker = str(ObjectId())
+        # Documents left with a marker by an interrupted run are claimed again.
+        result = await self.database[collection].update_many(
+            {"dedup_pending": {"$exists": True}},
+            {"$set": {"dedup_pending": marker}},
+        )
+        logger.info(f'Claimed {result.modified_count} documents pending deduplication in {collection}')
+        return marker
+
+    async def clear_dedup_pending(self, collection: str, marker: str) -> None:
+        await self.database[collection].update_many({"dedup_pending": marker}, {"$unset": {"dedup_pending": ""}})
+
+    async def get_data_version(self, collection: str) -> str | None:
+        document = await self.database[DATA_VERSIONS_COLLECTION].find_one({'_id': collection})
+        return document['version'] if document else None
+
+    async def bump_data_version(self, collection: str) -> str:
+        version = str(ObjectId())
+        await self.database[DATA_VERSIONS_COLLECTION].update_one(
+            {'_id': collection},
+            {'$set': {'version': version, 'updated_at': datetime.now()}},
+            upsert=True,
+        )
+        logger.debug(f'Data version of {collection} bumped to {version}')
+        return version
+
+    async def materialize_host_stats(self, collection: str, stats_collection: str) -> None:
+        run_id = str(ObjectId())
+        merge = {"$merge": {"into": stats_collection, "whenMatched": "replace", "whenNotMatched": "insert"}}
+        source = self.database[collection]
+        await self._run_aggregation(source, [
+            {"$match": {"platform": {"$ne": None}}},
+            {"$group": {"_id": "$platform", "count": {"$sum": 1}}},
+            stats_bucket('platform', run_id, platform="$_id"),
+            merge,
+        ])
+        await self._run_aggregation(source, [
+            # Ports are deduplicated per host, so every bucket counts hosts rather than port entries.
+            {"$project": {"platform": 1, "ports": {"$setUnion": [{"$ifNull": ["$open_ports.port", []]}, []]}}},
+            {"$unwind": "$ports"},
+            {"$group": {"_id": {"platform": "$platform", "port": "$ports"}, "count": {"$sum": 1}}},
+            stats_bucket('platform_port', run_id, platform="$_id.platform", port="$_id.port"),
+            merge,
+        ])
+        # Every host has a single platform, so port totals are summed from the matrix instead of rescanning hosts.
+        await self._run_aggregation(self.database[stats_collection], [
+            {"$match": {"kind": "platform_port", "run_id": run_id}},
+            {"$group": {"_id": "$port", "count": {"$sum": "$count"}}},
+            stats_bucket('port', run_id, port="$_id"),
+            merge,
+        ])
+        await self._run_aggregation(source, [
+            {"$match": {"last_seen_at": {"$type": "date"}}},
+            {"$group": {"_id": {"$dateTrunc": {"date": "$last_seen_at", "unit": "day"}}, "count": {"$sum": 1}}},
+            stats_bucket('last_seen_day', run_id, day="$_id"),
+            merge,
+        ])
+        result = await self.database[stats_collection].delete_many({"run_id": {"$ne": run_id}})
+        logger.info(f'Materialized host stats of {collection} into {stats_collection}, '
+                    f'{result.deleted_count} stale buckets removed')
+
+    @staticmethod
+    async def _run_aggregation(collection: AsyncCollection, pipeline: list[dict]) -> None:
+        cursor = await collection.aggregate(pipeline, allowDiskUse=True)
+        await cursor.to_list()
+
+    async def get_os_distribution(self, collection: str) -> dict[str, int]:
+        cursor = self.database[collection].find({"kind": "platform"}).sort("count", -1)
         return {doc["platform"]: doc["count"] async for doc in cursor}
 
     async def get_old_vs_new_hosts(self, collection: str, days_threshold: int = 30) -> dict[str, int]:
+        # Hosts are bucketed by day, so the threshold is rounded down to the start of its day.
         threshold_date = datetime.now() - timedelta(days=days_threshold)
+        threshold_day = datetime.combine(threshold_date.date(), time.min)
         pipeline = [
-            {"$match": {"last_seen_at": {"$ne": None}}},
+            {"$match": {"kind": "last_seen_day"}},
             {
                 "$group": {
                     "_id": {
                         "$cond": {
-                            "if": {"$lte": ["$last_seen_at", threshold_date]},
+                            "if": {"$lt": ["$day", threshold_day]},
                             "then": "old",
                             "else": "new"
                         }
                     },
-                    "count": {"$sum": 1}
+                    "count": {"$sum": "$count"}
                 }
             },
-            {"$project": {"category": "$_id", "count": 1, "_id": 0}}
         ]
         cursor = await self.database[collection].aggregate(pipeline)
         distribution = {"old": 0, "new": 0}
         async for doc in cursor:
-            distribution[doc["category"]] = doc["count"]
+            distribution[doc["_id"]] = doc["count"]
         return distribution
 
     async def get_open_ports_distribution(self, collection: str) -> dict[int, int]:
-        pipeline = [
-            {"$unwind": "$open_ports"},  # Unwind the open_ports array
-            {
-                "$group": {
-                    "_id": {
-                        "host_id": "$_id",  # Group by host document _id
-                        "port": "$open_ports.port"  # Include port number
-                    }
-                }
-            },  # Collect unique ports per host
-            {
-                "$group": {
-                    "_id": "$_id.port",  # Group by port number across all hosts
-                    "count": {"$sum": 1}  # Count number of hosts with this port
-                }
-            },
-            {"$sort": {"_id": 1}},  # Sort by port number
-            {
-                "$project": {
-                    "port": "$_id",
-                    "count": 1,
-                    "_id": 0
-                }
-            }
-        ]
-        cursor = await self.database[collection].aggregate(pipeline)
-        result = {doc["port"]: doc["count"] async for doc in cursor}
-        return result
+        cursor = self.database[collection].find({"kind": "port"}).sort("port", 1)
+        return {doc["port"]: doc["count"] async for doc in cursor}
 
     async def get_open_ports_by_platform_distribution(self, collection: str, ports_list: list[int]) -> dict[
-        str, dict[int, int]]:
-        pipeline = [
-            {"$match": {"platform": {"$ne": None}, "open_ports.port": {"$in": ports_list}}},
-            {"$unwind": "$open_ports"},
-            {
-                "$group": {
-                    "_id": {
-                        "host_id": "$_id",
-                        "platform": "$platform",
-                        "port": "$open_ports.port"
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": {
-                        "platform": "$_id.platform",
-                        "port": "$_id.port"
-                    },
-                    "count": {"$sum": 1}  # Count hosts per platform and port
-                }
-            },
-            {"$sort": {"_id.platform": 1, "_id.port": 1}},
-            {
-                "$group": {
-                    "_id": "$_id.platform",
-                    "ports": {
-                        "$push": {
-                            "port": "$_id.port",
-                            "count": "$count"
-                        }
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "platform": "$_id",
-                    "ports": {
-                        "$arrayToObject": {
-                            "$map": {
-                                "input": "$ports",
-                                "as": "item",
-                                "in": {
-                                    "k": {"$toString": "$$item.port"},
-                                    "v": "$$item.count"
-                                }
-                            }
-                        }
-                    },
-                    "_id": 0
-                }
-            }
-        ]
-        cursor = await self.database[collection].aggregate(pipeline)
-        result = {doc["platform"]: doc["ports"] async for doc in cursor}
+        str, dict[str, int]]:
+        cursor = self.database[collection].find(
+            {"kind": "platform_port", "platform": {"$ne": None}, "port": {"$in": ports_list}}
+        ).sort([("platform", 1), ("port", 1)])
+        result = {}
+        async for doc in cursor:
+            result.setdefault(doc["platform"], {})[str(doc["port"])] = doc["count"]
         return result
+
+
+class MongoPipelineJobRepository(PipelineJobRepository):
+    def __init__(self, client: AsyncMongoClient):
+        self.client = client
+        self.database = client[MONGODB_DATABASE]
+
+    async def acquire_lock(self, collection: str, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = datetime.now()
+        try:
+            # A lock held by someone else and not expired matches nothing, so the upsert fails on the unique _id.
+            await self.database[collection].update_one(
+                {'_id': name, '$or': [{'owner': owner}, {'expires_at': {'$lte': now}}]},
+                {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=ttl_seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release_lock(self, collection: str, name: str, owner: str) -> None:
+        await self.database[collection].delete_one({'_id': name, 'owner': owner})
+
+    async def get_lock_owner(self, collection: str, name: str) -> str | None:
+        document = await self.database[collection].find_one({'_id': name, 'expires_at': {'$gt': datetime.now()}})
+        return document['owner'] if document else None
+
+    async def save_job(self, collection: str, job: PipelineJob) -> None:
+        await self.database[collection].replace_one(
+            {'_id': job.id},
+            job.model_dump(exclude={'id'}),
+            upsert=True,
+        )
+
+    async def get_job(self, collection: str, job_id: str) -> PipelineJob | None:
+        document = await self.database[collection].find_one({'_id': job_id})
+        return PipelineJob(id=document.pop('_id'), **document) if document else None
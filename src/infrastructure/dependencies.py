@@ -1,65 +1,115 @@
 import os
 
-from src.core.ports.api_client import APIClientConfig
-from src.infrastructure.db.mongo.client import get_mongo_client
-from src.infrastructure.db.mongo.repositories import MongoHostRawDataRepository, MongoHostNormalizedDataRepository
-from src.infrastructure.ports.api_clients.crowdstrike_api_client import CrowdstrikeAPIClient
-from src.infrastructure.ports.api_clients.qualys_api_client import QualysAPIClient
+from src.core.ports.api_client import APIClient, APIClientConfig
+from src.core.ports.normalizer import Normalizer
+from src.infrastructure.ports.api_clients.declarative_api_client import APISpec, DeclarativeAPIClient
 from src.infrastructure.ports.mergers.priority_merger import PrioritySourceMerger
+from src.infrastructure.ports.normalizers.compiled_normalizer import CompiledNormalizer, FieldSpec, raw_projection
 from src.infrastructure.ports.normalizers.crowdstrike_normalizer import CrowdstrikeNormalizer
 from src.infrastructure.ports.normalizers.qualys_normalizer import QualysNormalizer
 from src.settings import PIPELINE_CONFIG
 
-SOURCES_API_CLIENTS = {
-    'qualys': QualysAPIClient,
-    'crowdstrike': CrowdstrikeAPIClient,
+# Hand-written normalizers, used instead of the compiled field specs when `normalization.compiled` is disabled.
+HAND_WRITTEN_NORMALIZERS = {
+    'qualys': QualysNormalizer,
+    'crowdstrike': CrowdstrikeNormalizer,
 }
 
-NORMALIZERS = {
-    'qualys': QualysNormalizer(),
-    'crowdstrike': CrowdstrikeNormalizer(),
+# Sources are declared in the pipeline config and compiled once per process.
+API_SPECS = {
+    source_slug: APISpec(**source_config['api'])
+    for source_slug, source_config in PIPELINE_CONFIG['fetching']['sources'].items()
 }
 
 
+def build_api_client(config: APIClientConfig) -> APIClient:
+    return DeclarativeAPIClient(config=config, spec=API_SPECS[config.slug])
+
+
+def get_field_specs(source_slug: str) -> dict[str, FieldSpec]:
+    fields = PIPELINE_CONFIG['normalization']['sources'][source_slug]['fields']
+    return {name: FieldSpec(**spec) for name, spec in fields.items()}
+
+
+def build_normalizers() -> dict[str, Normalizer]:
+    normalization_config = PIPELINE_CONFIG['normalization']
+    normalizers = {}
+    for source_slug in normalization_config['sources']:
+        if not normalization_config.get('compiled', True) and source_slug in HAND_WRITTEN_NORMALIZERS:
+            normalizers[source_slug] = HAND_WRITTEN_NORMALIZERS[source_slug]()
+        else:
+            normalizers[source_slug] = CompiledNormalizer(get_field_specs(source_slug),
+                                                          validate=normalization_config.get('validate', True))
+    return normalizers
+
+
+NORMALIZERS = build_normalizers()
+
+
+def build_merger() -> PrioritySourceMerger:
+    return PrioritySourceMerger(
+        source_priorities=PIPELINE_CONFIG['deduplication']['source_priorities'],
+        strategies=PIPELINE_CONFIG['deduplication'].get('merge_strategies'),
+    )
+
+
 def build_fetching_step_params() -> list[dict]:
     fetching_process_params = []
+    state_collection = PIPELINE_CONFIG['fetching'].get('state_collection', 'fetching_state')
     for source_slug, source_config in PIPELINE_CONFIG['fetching']['sources'].items():
+        incremental_config = source_config.get('incremental', {})
         api_config = {
             'slug': source_slug,
             'api_token': os.getenv(source_config['api_token_env']),
             'offset': source_config['offset'],
             'limit': source_config['limit'],
+            'concurrency': source_config.get('concurrency', 1),
+            'timeout': source_config.get('timeout', 60),
+            'adaptive': source_config.get('adaptive', {}),
+            'stream_parse': source_config.get('stream_parse', False),
         }
         fetching_process_params.append({
             'source': source_slug,
             'collection': source_config['target_collection'],
-            'api_client': SOURCES_API_CLIENTS[source_slug](config=APIClientConfig(**api_config)),
-            'repository': MongoHostRawDataRepository(client=get_mongo_client()),
+            'api_client': build_api_client(APIClientConfig(**api_config)),
+            'state_collection': state_collection,
+            'incremental': incremental_config.get('enabled', False),
+            'cursor_field': incremental_config.get('cursor_field'),
+            'resume_from_offset': incremental_config.get('resume_from_offset', False),
+            'id_field': source_config.get('id_field'),
         })
     return fetching_process_params
 
 
 def build_normalization_step_params() -> list[dict]:
     params = []
-    for source_slug, source_config in PIPELINE_CONFIG['normalization']['sources'].items():
+    normalization_config = PIPELINE_CONFIG['normalization']
+    for source_slug, source_config in normalization_config['sources'].items():
         params.append({
+            'source': source_slug,
+            'workers': source_config.get('workers', 1),
             'source_collection': source_config['source_collection'],
             'target_collection': source_config['target_collection'],
             'normalizer': NORMALIZERS[source_slug],
-            'raw_repository': MongoHostRawDataRepository(client=get_mongo_client()),
-            'normal_repository': MongoHostNormalizedDataRepository(client=get_mongo_client()),
+            'batch_size': normalization_config.get('batch_size', 10),
+            'cursor_batch_size': normalization_config.get('cursor_batch_size'),
+            # The hand-written normalizers read the same fields as the specs.
+            'projection': raw_projection(get_field_specs(source_slug)),
         })
     return params
 
 
-def build_deduplication_step_params() -> list[dict]:
+def build_streaming_step_params() -> list[dict]:
+    streaming_config = PIPELINE_CONFIG.get('streaming', {})
+    normalization_sources = PIPELINE_CONFIG['normalization']['sources']
     params = []
-    for source_slug, source_config in PIPELINE_CONFIG['sources'].items():
+    for fetching_params in build_fetching_step_params():
+        source_slug = fetching_params['source']
         params.append({
-            'source_collection': source_config['target_collection'],
-            'target_collection': source_config['target_collection'],
-            'normal_repository': MongoHostNormalizedDataRepository(client=get_mongo_client()),
-            'merger': PrioritySourceMerger(source_priorities=PIPELINE_CONFIG['deduplication']['source_priorities']),
+            'fetching_params': fetching_params,
+            'normalizer': NORMALIZERS[source_slug],
+            'target_collection': normalization_sources[source_slug]['target_collection'],
+            'queue_size': streaming_config.get('queue_size', 4),
+            'archive_raw': streaming_config.get('archive_raw', True),
         })
-
     return params
@@ -0,0 +1,113 @@
+import logging
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterator
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+                               push_to_gateway)
+from prometheus_client.metrics import MetricWrapperBase
+
+from src.core.ports.metrics import Metrics, get_metrics, set_metrics
+from src.settings import METRICS_ENABLED, METRICS_JOB_NAME, METRICS_PUSHGATEWAY_URL
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+GROUP_SIZE_BUCKETS = (2, 3, 4, 5, 8, 16, 32, 64, 128)
+
+
+METRICS: dict[str, Callable[..., MetricWrapperBase]] = {
+    'api_request_duration_seconds': partial(Histogram, documentation='Vendor API requests latency.',
+                                            labelnames=['source', 'status'], buckets=LATENCY_BUCKETS),
+    'api_request_retries_total': partial(Counter, documentation='Vendor API requests retried after a failure.',
+                                         labelnames=['source']),
+    'fetched_hosts_total': partial(Counter, documentation='Hosts fetched from vendor APIs.', labelnames=['source']),
+    'kept_hosts_total': partial(Counter, documentation='Fetched hosts that are new or changed.',
+                                labelnames=['source']),
+    'normalized_docs_total': partial(Counter, documentation='Raw documents normalized.', labelnames=['collection']),
+    'normalize_batch_duration_seconds': partial(Histogram,
+                                                documentation='Time spent normalizing one batch of raw documents.',
+                                                labelnames=['collection'], buckets=LATENCY_BUCKETS),
+    'streaming_queue_depth': partial(Gauge, documentation='Batches waiting in a streaming pipeline queue.',
+                                     labelnames=['source', 'queue']),
+    'dedup_group_size': partial(Histogram, documentation='Documents in a group of duplicates.',
+                                labelnames=['collection'], buckets=GROUP_SIZE_BUCKETS),
+    'merged_docs_total': partial(Counter, documentation='Duplicate documents merged.', labelnames=['collection']),
+    'mongo_command_duration_seconds': partial(Histogram, documentation='Mongo commands round trip time.',
+                                              labelnames=['command', 'collection'], buckets=LATENCY_BUCKETS),
+    'mongo_command_failures_total': partial(Counter, documentation='Mongo commands that failed.',
+                                            labelnames=['command', 'collection']),
+    'pipeline_step_duration_seconds': partial(Gauge, documentation='Duration of the last run of a step.',
+                                              labelnames=['step']),
+    'pipeline_step_documents': partial(Gauge, documentation='Documents processed by the last run of a step.',
+                                       labelnames=['step']),
+    'pipeline_step_docs_per_second': partial(Gauge, documentation='Throughput of the last run of a step.',
+                                             labelnames=['step']),
+}
+
+
+def build_metrics(registry: CollectorRegistry) -> dict[str, MetricWrapperBase]:
+    """Register the pipeline's metrics in `registry`, keyed by the name they are recorded under."""
+    return {name: build(name, registry=registry) for name, build in METRICS.items()}
+
+
+class PrometheusMetrics(Metrics):
+    """`Metrics` recorded into a `prometheus_client` registry of its own."""
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self._metrics = build_metrics(self.registry)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        self._metrics[name].labels(**labels).inc(value)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        self._metrics[name].labels(**labels).set(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._metrics[name].labels(**labels).observe(value)
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+def setup_metrics() -> None:
+    """Install the Prometheus registry in this process, unless metrics are disabled or already set up."""
+    if METRICS_ENABLED and not isinstance(get_metrics(), PrometheusMetrics):
+        set_metrics(PrometheusMetrics())
+
+
+def render_metrics() -> bytes:
+    metrics = get_metrics()
+    return generate_latest(metrics.registry) if isinstance(metrics, PrometheusMetrics) else b''
+
+
+def push_metrics(process: str) -> None:
+    """Replace the metrics of `process` in the Pushgateway with the ones of this process, if a gateway is set."""
+    metrics = get_metrics()
+    if not METRICS_PUSHGATEWAY_URL or not isinstance(metrics, PrometheusMetrics):
+        return
+    try:
+        push_to_gateway(METRICS_PUSHGATEWAY_URL, job=METRICS_JOB_NAME, registry=metrics.registry,
+                        grouping_key={'process': process}, timeout=10)
+    except OSError as e:
+        # Monitoring being down should not fail the pipeline.
+        logger.warning(f'Could not push metrics of {process} to {METRICS_PUSHGATEWAY_URL}: {e}')
+
+
+@contextmanager
+def process_metrics(process: str) -> Iterator[None]:
+    """Count the metrics of a forked pipeline process from zero and push them when it ends.
+
+    Forked processes inherit the parent's registry, which would otherwise be pushed twice.
+    """
+    setup_metrics()
+    metrics = get_metrics()
+    if isinstance(metrics, PrometheusMetrics):
+        metrics.reset()
+    try:
+        yield
+    finally:
+        push_metrics(process)
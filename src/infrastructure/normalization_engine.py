@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.application.services.normalization_service import NormalizationService
+from src.core.ports.repositories import IdRange
+from src.infrastructure.db.mongo.client import mongo_client_lifespan
+from src.infrastructure.db.mongo.repositories import MongoHostRawDataRepository, MongoHostNormalizedDataRepository
+from src.infrastructure.dependencies import NORMALIZERS
+from src.infrastructure.metrics import push_metrics, setup_metrics
+from src.infrastructure.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# Several ranges per worker keep the pool busy when ranges normalize at different speeds.
+RANGES_PER_WORKER = 4
+
+
+def normalize_id_range(source: str, source_collection: str, target_collection: str, id_range: IdRange,
+                       marker: str | None, service_options: dict) -> tuple[int, int, float]:
+    """Normalize one `_id` range in a pool worker, returning the worker pid, docs count and elapsed seconds."""
+    async def run():
+        async with mongo_client_lifespan() as client:
+            normalization_service = NormalizationService(
+                source_collection=source_collection,
+                target_collection=target_collection,
+                normalizer=NORMALIZERS[source],
+                raw_repository=MongoHostRawDataRepository(client=client),
+                normal_repository=MongoHostNormalizedDataRepository(client=client),
+                **service_options,
+            )
+            return await normalization_service.normalize(id_range=id_range, marker=marker)
+
+    setup_metrics()
+    started_at = time.perf_counter()
+    with profile_stage('normalization'):
+        count = asyncio.run(run())
+    # Pool workers keep their counters across ranges, so each push carries the worker's totals so far.
+    push_metrics(f'normalization_{source}_{multiprocessing.current_process().name}')
+    return os.getpid(), count, time.perf_counter() - started_at
+
+
+class ProcessPoolNormalizationEngine:
+    """Normalize one source's raw collection with a pool of processes, each streaming its own `_id` ranges.
+
+    Like `NormalizationService.normalize_pending`, only the documents pending normalization are normalized unless
+    `full_resync` is set.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+
+    def run(self, source: str, source_collection: str, target_collection: str, full_resync: bool = False,
+            **service_options) -> dict[int, tuple[int, float]]:
+        marker = asyncio.run(self._claim_pending(source_collection))
+        id_ranges = asyncio.run(self._get_id_ranges(source_collection))
+        logger.info(f'Normalizing {source_collection} in {len(id_ranges)} ranges with {self.workers} workers')
+
+        started_at = time.perf_counter()
+        workers_stats: dict[int, tuple[int, float]] = {}
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [
+                pool.submit(normalize_id_range, source, source_collection, target_collection, id_range,
+                            None if full_resync else marker, service_options)
+                for id_range in id_ranges
+            ]
+            for future in as_completed(futures):
+                pid, count, seconds = future.result()
+                worker_count, worker_seconds = workers_stats.get(pid, (0, 0.0))
+                workers_stats[pid] = (worker_count + count, worker_seconds + seconds)
+        asyncio.run(self._clear_pending(source_collection, marker))
+
+        for pid, (count, seconds) in workers_stats.items():
+            logger.info(f'Worker {pid} normalized {count} docs in {seconds:.2f}s '
+                        f'({count / max(seconds, 1e-9):.0f} docs/s)')
+        total = sum(count for count, _ in workers_stats.values())
+        elapsed = time.perf_counter() - started_at
+        logger.info(f'Normalized {total} docs from {source_collection} in {elapsed:.2f}s '
+                    f'({total / max(elapsed, 1e-9):.0f} docs/s)')
+        return workers_stats
+
+    @staticmethod
+    async def _claim_pending(source_collection: str) -> str:
+        async with mongo_client_lifespan() as client:
+            return await MongoHostRawDataRepository(client=client).claim_normalize_pending(source_collection)
+
+    @staticmethod
+    async def _clear_pending(source_collection: str, marker: str) -> None:
+        async with mongo_client_lifespan() as client:
+            await MongoHostRawDataRepository(client=client).clear_normalize_pending(source_collection, marker)
+
+    async def _get_id_ranges(self, source_collection: str) -> list[IdRange]:
+        async with mongo_client_lifespan() as client:
+            raw_repository = MongoHostRawDataRepository(client=client)
+            return await raw_repository.get_id_ranges(source_collection, self.workers * RANGES_PER_WORKER)
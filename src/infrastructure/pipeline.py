@@ -1,61 +1,287 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from typing import Callable
+
+from src.application.services.blocking_index import BlockingConfig
 from src.application.services.deduplication_service import DeduplicationService
 from src.application.services.fetching_service import FetchingService
 from src.application.services.normalization_service import NormalizationService
-from src.infrastructure.db.mongo.client import get_mongo_client
-from src.infrastructure.db.mongo.repositories import MongoHostNormalizedDataRepository
-from src.infrastructure.dependencies import build_fetching_step_params, build_normalization_step_params
-from src.infrastructure.ports.mergers.priority_merger import PrioritySourceMerger
+from src.application.services.stats_service import HostStatsService
+from src.application.services.streaming_service import StreamingPipelineService
+from src.core.entities import PipelineJob
+from src.core.ports.metrics import get_metrics
+from src.infrastructure.db.mongo.client import dedicated_mongo_client, mongo_client_lifespan
+from src.infrastructure.db.mongo.repositories import (MongoFetchingStateRepository, MongoHostNormalizedDataRepository,
+                                                      MongoHostRawDataRepository, MongoPipelineJobRepository)
+from src.infrastructure.dependencies import (build_fetching_step_params, build_merger, build_normalization_step_params,
+                                             build_streaming_step_params)
+from src.infrastructure.metrics import process_metrics, push_metrics, setup_metrics
+from src.infrastructure.normalization_engine import ProcessPoolNormalizationEngine
+from src.infrastructure.profiling import profile_stage
 from src.infrastructure.utils import run_parallel, run_via_asyncio
-from src.settings import PIPELINE_CONFIG
+from src.settings import (PIPELINE_CONFIG, PIPELINE_JOBS_COLLECTION, PIPELINE_LOCK_NAME, PIPELINE_LOCK_TTL_SECONDS,
+                          PIPELINE_LOCKS_COLLECTION)
+
+logger = logging.getLogger(__name__)
+
+PipelineStep = tuple[str, Callable[[], int | None]]
 
 
-def fetching_step():
-    def run_fetching_process(source, collection, api_client, repository):
+def fetching_step(full_resync: bool = False) -> int:
+    def run_fetching_process(**params):
         async def run():
-            fetching_service = FetchingService(
-                source=source,
-                collection=collection,
-                api_client=api_client,
-                repository=repository,
-            )
-            await fetching_service.fetch_data()
+            async with mongo_client_lifespan() as client:
+                fetching_service = FetchingService(
+                    repository=MongoHostRawDataRepository(client=client),
+                    state_repository=MongoFetchingStateRepository(client=client),
+                    **params,
+                )
+                return await fetching_service.fetch_data(full_resync=full_resync)
 
-        run_via_asyncio(run())
+        with process_metrics(f'fetching_{params["source"]}'), profile_stage('fetching'):
+            return run_via_asyncio(run())
+
+    return sum(run_parallel(run_fetching_process, build_fetching_step_params()))
 
-    run_parallel(run_fetching_process, build_fetching_step_params())
 
+def normalization_step(full_resync: bool = False) -> int:
+    def run_normalization_process(source, workers, **params):
+        async def run():
+            async with mongo_client_lifespan() as client:
+                normalization_service = NormalizationService(
+                    raw_repository=MongoHostRawDataRepository(client=client),
+                    normal_repository=MongoHostNormalizedDataRepository(client=client),
+                    **params,
+                )
+                return await normalization_service.normalize_pending(full_resync=full_resync)
+
+        with process_metrics(f'normalization_{source}'), profile_stage('normalization'):
+            if workers > 1:
+                engine = ProcessPoolNormalizationEngine(workers=workers)
+                workers_stats = engine.run(
+                    source=source,
+                    source_collection=params['source_collection'],
+                    target_collection=params['target_collection'],
+                    full_resync=full_resync,
+                    batch_size=params['batch_size'],
+                    cursor_batch_size=params['cursor_batch_size'],
+                    projection=params['projection'],
+                )
+                return sum(count for count, _ in workers_stats.values())
+            return run_via_asyncio(run())
+
+    return sum(run_parallel(run_normalization_process, build_normalization_step_params()))
 
-def normalization_step():
-    def run_normalization_process(source_collection, target_collection, normalizer, raw_repository, normal_repository):
+
+def streaming_step(full_resync: bool = False) -> int:
+    def run_streaming_process(fetching_params, **params):
         async def run():
-            normalization_service = NormalizationService(
-                source_collection=source_collection,
-                target_collection=target_collection,
-                normalizer=normalizer,
-                raw_repository=raw_repository,
-                normal_repository=normal_repository,
+            async with mongo_client_lifespan() as client:
+                fetching_service = FetchingService(
+                    repository=MongoHostRawDataRepository(client=client),
+                    state_repository=MongoFetchingStateRepository(client=client),
+                    **fetching_params,
+                )
+                streaming_service = StreamingPipelineService(
+                    fetching_service=fetching_service,
+                    normal_repository=MongoHostNormalizedDataRepository(client=client),
+                    **params,
+                )
+                return await streaming_service.run(full_resync=full_resync)
+
+        with process_metrics(f'streaming_{fetching_params["source"]}'), profile_stage('streaming'):
+            return run_via_asyncio(run())
+
+    return sum(run_parallel(run_streaming_process, build_streaming_step_params()))
+
+
+def deduplication_step(full_resync: bool = False) -> int:
+    async def run():
+        async with mongo_client_lifespan() as client:
+            deduplication_service = DeduplicationService(
+                collection=PIPELINE_CONFIG['deduplication']['collection'],
+                normal_repository=MongoHostNormalizedDataRepository(client=client),
+                merger=build_merger(),
+                transactional=PIPELINE_CONFIG['deduplication'].get('transactional', False),
+                blocking=BlockingConfig(**PIPELINE_CONFIG['deduplication'].get('blocking', {})),
+            )
+            return await deduplication_service.deduplicate(
+                batch_size=PIPELINE_CONFIG['deduplication'].get('batch_size', 10),
+                incremental=PIPELINE_CONFIG['deduplication'].get('incremental', False) and not full_resync,
+            )
+
+    with profile_stage('deduplication'):
+        return run_via_asyncio(run())
+
+
+def stats_step() -> None:
+    async def run():
+        async with mongo_client_lifespan() as client:
+            stats_service = HostStatsService(
+                source_collection=PIPELINE_CONFIG['stats']['source_collection'],
+                stats_collection=PIPELINE_CONFIG['stats']['collection'],
+                normal_repository=MongoHostNormalizedDataRepository(client=client),
             )
-            await normalization_service.normalize()
+            await stats_service.materialize()
 
+    with profile_stage('stats'):
         run_via_asyncio(run())
 
-    run_parallel(run_normalization_process, build_normalization_step_params())
+
+def get_pipeline_steps(full_resync: bool = False, streaming: bool = False) -> list[PipelineStep]:
+    """Return the pipeline steps in execution order, each returning the number of documents it processed."""
+    if streaming:
+        ingestion_steps = [('streaming', partial(streaming_step, full_resync=full_resync))]
+    else:
+        ingestion_steps = [
+            ('fetching', partial(fetching_step, full_resync=full_resync)),
+            ('normalization', partial(normalization_step, full_resync=full_resync)),
+        ]
+    return [
+        *ingestion_steps,
+        ('deduplication', partial(deduplication_step, full_resync=full_resync)),
+        ('stats', stats_step),
+    ]
+
+
+def run_step(name: str, step: Callable[[], int | None]) -> tuple[int | None, float]:
+    """Run a pipeline step and record its duration and throughput, returning its documents count and seconds."""
+    started_at = time.perf_counter()
+    documents = step()
+    elapsed = time.perf_counter() - started_at
+    metrics = get_metrics()
+    metrics.set_gauge('pipeline_step_duration_seconds', elapsed, step=name)
+    if documents is not None:
+        metrics.set_gauge('pipeline_step_documents', documents, step=name)
+        metrics.set_gauge('pipeline_step_docs_per_second', documents / max(elapsed, 1e-9), step=name)
+    logger.info(f'Pipeline step {name} processed {documents} docs in {elapsed:.2f}s')
+    return documents, elapsed
 
 
-def deduplication_step():
+def refresh_pipeline_lock(owner: str) -> bool:
+    """Take or extend the pipeline lock for a job or a CLI run, returning False while another owner holds it.
+
+    It runs with a client of its own, being also called by `PipelineLockHeartbeat` threads.
+    """
+    async def run():
+        async with dedicated_mongo_client() as client:
+            return await MongoPipelineJobRepository(client=client).acquire_lock(
+                PIPELINE_LOCKS_COLLECTION, PIPELINE_LOCK_NAME, owner, PIPELINE_LOCK_TTL_SECONDS,
+            )
+
+    return run_via_asyncio(run())
+
+
+def release_pipeline_lock(owner: str) -> None:
     async def run():
-        normalized_data_repository = MongoHostNormalizedDataRepository(client=get_mongo_client())
-        deduplication_service = DeduplicationService(
-            collection=PIPELINE_CONFIG['deduplication']['collection'],
-            normal_repository=normalized_data_repository,
-            merger=PrioritySourceMerger(source_priorities=PIPELINE_CONFIG['deduplication']['source_priorities']),
-        )
-        await deduplication_service.deduplicate()
+        async with mongo_client_lifespan() as client:
+            await MongoPipelineJobRepository(client=client).release_lock(PIPELINE_LOCKS_COLLECTION,
+                                                                         PIPELINE_LOCK_NAME, owner)
 
     run_via_asyncio(run())
 
 
+class PipelineLockHeartbeat:
+    """Refresh the pipeline lock of its owner from a background thread every third of its TTL while a step runs.
+
+    The lock then expires only when this process dies or hangs. A failed refresh stops the heartbeat and sets `lost`,
+    the job being aborted once the running step returns.
+    """
+
+    def __init__(self, owner: str, interval: float = PIPELINE_LOCK_TTL_SECONDS / 3):
+        self.owner = owner
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    def __enter__(self) -> 'PipelineLockHeartbeat':
+        self._stopped.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name='pipeline-lock-heartbeat', daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._heartbeat.join()
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                refreshed = refresh_pipeline_lock(self.owner)
+            except Exception:
+                # A transient Mongo error is retried on the next beat, the lock outliving a couple of them.
+                logger.exception(f'Failed to refresh the pipeline lock of {self.owner}')
+                continue
+            if not refreshed:
+                logger.error(f'Pipeline run {self.owner} lost its lock')
+                self.lost.set()
+                return
+
+
+def run_locked_step(owner: str, name: str, step: Callable[[], int | None]) -> tuple[int | None, float]:
+    """Run a pipeline step like `run_step` while `owner` holds the pipeline lock, refreshing it before and while
+    the step runs, and fail if the lock is lost."""
+    if not refresh_pipeline_lock(owner):
+        raise RuntimeError(f'Pipeline run {owner} lost its lock before step {name}')
+    with PipelineLockHeartbeat(owner) as heartbeat:
+        result = run_step(name, step)
+    if heartbeat.lost.is_set():
+        raise RuntimeError(f'Pipeline run {owner} lost its lock during step {name}')
+    return result
+
+
+def run_pipeline_job(job_id: str) -> None:
+    """Run the steps of a pipeline job, persisting its progress after every step and releasing its lock at the end.
+
+    Meant to be executed in a dedicated process, it expects the job to be saved and the lock to be held by the job.
+    The lock is refreshed before and while every step runs, and the job fails as soon as it is lost.
+    """
+    def update_job(release_lock: bool = False):
+        async def run():
+            async with mongo_client_lifespan() as client:
+                job_repository = MongoPipelineJobRepository(client=client)
+                await job_repository.save_job(PIPELINE_JOBS_COLLECTION, job)
+                if release_lock:
+                    await job_repository.release_lock(PIPELINE_LOCKS_COLLECTION, PIPELINE_LOCK_NAME, job.id)
+
+        run_via_asyncio(run())
+
+    async def load_job():
+        async with mongo_client_lifespan() as client:
+            return await MongoPipelineJobRepository(client=client).get_job(PIPELINE_JOBS_COLLECTION, job_id)
+
+    setup_metrics()
+    job: PipelineJob = run_via_asyncio(load_job())
+    job.status, job.started_at = 'running', datetime.now()
+    steps = dict(get_pipeline_steps(full_resync=job.full_resync, streaming=job.streaming))
+    step = None
+    try:
+        for step in job.steps:
+            step.status, step.started_at = 'running', datetime.now()
+            update_job()
+            step.documents, elapsed = run_locked_step(job.id, step.name, steps[step.name])
+            step.status, step.finished_at = 'succeeded', datetime.now()
+            if step.documents is not None:
+                step.docs_per_second = step.documents / max(elapsed, 1e-9)
+        job.status = 'succeeded'
+    except Exception as e:
+        logger.exception(f'Pipeline job {job.id} failed')
+        if step is not None:
+            step.status, step.finished_at = 'failed', datetime.now()
+        job.status, job.error = 'failed', str(e)
+        raise
+    finally:
+        job.finished_at = datetime.now()
+        update_job(release_lock=True)
+        push_metrics('pipeline')
+
+
 if __name__ == "__main__":
     fetching_step()
     normalization_step()
     deduplication_step()
+    stats_step()
@@ -0,0 +1,55 @@
+from typing import Literal
+
+from aiohttp import ClientResponse
+from pydantic import BaseModel, Field
+
+from src.core.ports.api_client import APIClient, APIClientConfig
+
+
+class PaginationSpec(BaseModel):
+    """How pages are requested: by `offset` of the first host or by `page` number, with the page size as limit."""
+    style: Literal['offset', 'page'] = 'offset'
+    offset_param: str = 'skip'
+    limit_param: str = 'limit'
+    page_param: str = 'page'
+    first_page: int = 1
+
+
+class APISpec(BaseModel):
+    endpoint_url: str
+    method: Literal['GET', 'POST'] = 'GET'
+    token_header: str = 'Token'
+    pagination: PaginationSpec = Field(default_factory=PaginationSpec)
+    # Keys leading to the list of hosts when a response wraps it, e.g. `["data", "items"]`.
+    records_path: list[str] = Field(default_factory=list)
+
+
+class DeclarativeAPIClient(APIClient):
+    """API client of a source described by an `APISpec` of the pipeline config instead of a subclass."""
+
+    def __init__(self, config: APIClientConfig, spec: APISpec):
+        self.slug = config.slug
+        self.endpoint_url = spec.endpoint_url
+        self.method = spec.method
+        self.spec = spec
+        if spec.pagination.style == 'page' and (config.adaptive.enabled or config.offset % config.limit):
+            # Page numbers are derived from offsets, which stay page-aligned only with a fixed page size.
+            raise ValueError(f'Page pagination of {config.slug} needs a fixed limit and an offset multiple of it')
+        if config.stream_parse and spec.records_path:
+            raise ValueError(f'Streaming parse of {config.slug} needs the hosts array at the top level of responses')
+        super().__init__(config)
+
+    def request_params(self, limit: int, offset: int) -> dict:
+        pagination = self.spec.pagination
+        if pagination.style == 'page':
+            return {pagination.page_param: offset // limit + pagination.first_page, pagination.limit_param: limit}
+        return {pagination.offset_param: offset, pagination.limit_param: limit}
+
+    def request_headers(self) -> dict:
+        return {self.spec.token_header: self.config.api_token}
+
+    async def parse_response(self, response: ClientResponse) -> list[dict]:
+        content = await super().parse_response(response)
+        for key in self.spec.records_path:
+            content = content.get(key) if isinstance(content, dict) else None
+        return content or []
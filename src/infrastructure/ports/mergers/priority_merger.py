@@ -1,46 +1,153 @@
 import logging
 from datetime import datetime
+from typing import Literal, get_args
 
 from src.core.entities import HostNormalizedData, HostUnmergedDataGroup
 from src.core.ports.merger import Merger
-from src.infrastructure.utils import dig
 
 logger = logging.getLogger(__name__)
 
+MergeStrategy = Literal['priority', 'union', 'max', 'min', 'sum']
+
+# Fields without a strategy are taken from the highest priority document having a truthy value.
+DEFAULT_MERGE_STRATEGIES: dict[str, MergeStrategy] = {
+    'first_seen_at': 'min',
+    'last_seen_at': 'max',
+}
+# Fields describing how a document was merged rather than the host.
+NOT_MERGED_FIELDS = ('sources', 'dedup_pending', 'source_values')
+# Lists of hashable items, which can be merged by union.
+UNION_FIELDS = ('open_ports', 'software')
+
+AGGREGATES = {
+    'max': max,
+    'min': min,
+    'sum': sum,
+}
+# Types of the values each aggregate can be computed from.
+AGGREGATE_TYPES = {
+    'max': (int, float, datetime),
+    'min': (int, float, datetime),
+    'sum': (int, float),
+}
+
+
+def field_type(name: str) -> type:
+    """Return the type of a `HostNormalizedData` field, without `None`."""
+    annotation = HostNormalizedData.model_fields[name].annotation
+    types = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return types[0] if len(types) == 1 else annotation
+
 
 class PrioritySourceMerger(Merger):
-    def __init__(self, source_priorities: dict):
+    """Merge duplicates field by field, documents ordered by the priority of their first source.
+
+    A document merged by a previous run has its sources in priority order, so it ties with the new documents of
+    its first source: those pending deduplication come first, for fresh values to replace the merged ones.
+
+    Every field is first taken by priority, then the fields with another strategy are replaced by the union
+    (in priority order) or the max/min/sum of the truthy values of the group. The merged `sources` are the sources
+    of the documents a field was taken from by priority, or a value was unioned or summed from.
+
+    A previous merge already holds the union or aggregate of its own documents, so it keeps these values by source
+    in `source_values`: the sources of the documents pending deduplication take their fresh values and the other
+    sources the ones kept. Otherwise closed ports would be kept forever, sums would add up the previous total again
+    and maxima would never decrease, or the values of the sources not normalized again would be lost.
+    """
+
+    def __init__(self, source_priorities: dict, strategies: dict[str, MergeStrategy] | None = None):
         self.source_priorities = source_priorities
+        self.strategies = {**DEFAULT_MERGE_STRATEGIES, **(strategies or {})}
+        for name, strategy in self.strategies.items():
+            if name not in HostNormalizedData.model_fields or name in NOT_MERGED_FIELDS:
+                raise ValueError(f'Unknown merged field {name}')
+            if strategy == 'union' and name in UNION_FIELDS or strategy == 'priority':
+                continue
+            value_type = field_type(name)
+            if (strategy not in AGGREGATES or not isinstance(value_type, type)
+                    or not issubclass(value_type, AGGREGATE_TYPES[strategy])):
+                raise ValueError(f'Merge strategy {strategy} is not supported for {name}')
+        self._fields = [name for name in HostNormalizedData.model_fields if name not in NOT_MERGED_FIELDS]
+        self._unions = [name for name, strategy in self.strategies.items() if strategy == 'union']
+        self._aggregates = [(name, strategy, AGGREGATES[strategy]) for name, strategy in self.strategies.items()
+                            if strategy in AGGREGATES]
+        self._strategy_fields = [*self._unions, *(name for name, _, _ in self._aggregates)]
+        # The sources of the values unioned or summed are sources of the merged document.
+        self._sourced_fields = [name for name, strategy in self.strategies.items() if strategy in ('union', 'sum')]
+
+    def _values(self, doc) -> dict:
+        return {name: getattr(doc, name) for name in self._strategy_fields}
+
+    def _combine(self, values: list[dict]) -> dict:
+        """Union or aggregate the values of each strategy field."""
+        combined = {}
+        for name in self._unions:
+            # Items are deduplicated by their hash, keeping the first occurrence in priority order.
+            items = {}
+            for doc_values in values:
+                items.update(dict.fromkeys(doc_values.get(name) or ()))
+            combined[name] = list(items)
+        for name, _, aggregate in self._aggregates:
+            name_values = [value for doc_values in values if (value := doc_values.get(name))]
+            combined[name] = aggregate(name_values) if name_values else None
+        return combined
 
     def merge(self, group: HostUnmergedDataGroup) -> HostNormalizedData:
-        logger.info(f'Merging group {group.group_id}, docs count: {len(group.group_docs)}')
-        merged_doc = group.group_id
-        merged_doc['sources'] = []
-        ordered_docs = self.__order_docs(group.group_docs)
-        for doc in ordered_docs:
-            for key, value in doc.model_dump(exclude_unset=True).items():
-                if key not in merged_doc and value:
-                    merged_doc[key] = value
-                    merged_doc['sources'].extend(doc.sources)
+        return self.merge_batch([group])[0]
+
+    def merge_batch(self, groups: list[HostUnmergedDataGroup]) -> list[HostNormalizedData]:
+        """Merge groups reading the fields of the documents directly instead of dumping them, the group ids
+        are copied so the groups are left untouched."""
+        logger.debug(f'Merging {len(groups)} groups, docs count: {sum(len(group.group_docs) for group in groups)}')
+        priorities = self.source_priorities
+        fields = self._fields
+        results = []
+        for group in groups:
+            docs = group.group_docs
+            if len(docs) > 1:
+                docs = sorted(docs, key=lambda doc: (priorities.get(doc.sources[0] if doc.sources else None, 0),
+                                                     doc.dedup_pending is not None), reverse=True)
+            merged_doc = dict(group.group_id)
+            sources = {}
+            remaining = [name for name in fields if name not in merged_doc]
+            for doc in docs:
+                taken = [(name, value) for name in remaining if (value := getattr(doc, name))]
+                if not taken:
                     continue
-        merged_doc['sources'] = list(set(merged_doc['sources']))
-        result_doc = HostNormalizedData(**merged_doc)
-        result_doc.first_seen_at = self.__merge_first_seen_at(docs=group.group_docs)
-        result_doc.last_seen_at = self.__merge_last_seen_at(docs=group.group_docs)
-
-        return result_doc
-
-    def __order_docs(self, docs: list[HostNormalizedData]) -> list[HostNormalizedData]:
-        return sorted(
-            docs,
-            key=lambda d: self.source_priorities.get(dig(d.sources, 0), 0),
-            reverse=True,
-        )
-
-    def __merge_first_seen_at(self, docs: list[HostNormalizedData]) -> datetime | None:
-        datetime_ordered = sorted([doc.first_seen_at for doc in docs if doc.first_seen_at])
-        return datetime_ordered[0] if datetime_ordered else None
-
-    def __merge_last_seen_at(self, docs: list[HostNormalizedData]) -> datetime | None:
-        datetime_ordered = sorted([doc.last_seen_at for doc in docs if doc.last_seen_at], reverse=True)
-        return datetime_ordered[0] if datetime_ordered else None
+                merged_doc.update(taken)
+                sources.update(dict.fromkeys(doc.sources or ()))
+                remaining = [name for name in remaining if name not in merged_doc]
+                if not remaining:
+                    break
+
+            # Fresh documents replace the values a previous merge kept for their sources.
+            pending = [doc for doc in docs if doc.dedup_pending is not None]
+            contributions: dict[str, list[dict]] = {}
+            for doc in pending:
+                contributions.setdefault(doc.sources[0] if doc.sources else '', []).append(self._values(doc))
+            refreshed = set(contributions)
+            for doc in docs:
+                if doc.dedup_pending is not None:
+                    continue
+                # Documents merged before values were kept by source count as their first source.
+                source_values = doc.source_values or {doc.sources[0] if doc.sources else '': self._values(doc)}
+                for source, values in source_values.items():
+                    if source not in refreshed:
+                        contributions.setdefault(source, []).append(values)
+
+            source_values = {
+                source: values[0] if len(values) == 1 else self._combine(values)
+                for source, values in sorted(contributions.items(), key=lambda item: priorities.get(item[0], 0),
+                                             reverse=True)
+            }
+            merged_doc.update(self._combine(list(source_values.values())))
+            sources.update((source, None) for source, values in source_values.items()
+                           if source and any(values[name] for name in self._sourced_fields))
+            merged_doc['source_values'] = {source: values for source, values in source_values.items() if source}
+            if 'open_ports' in self._unions and merged_doc['open_ports']:
+                merged_doc['open_ports_count'] = len(merged_doc['open_ports'])
+
+            merged_doc['sources'] = list(sources)
+            # Open ports and software are slotted records, read by attributes.
+            results.append(HostNormalizedData.model_validate(merged_doc, from_attributes=True))
+        return results
@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Any, Callable, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from src.core.entities import HostNormalizedData, HostRawData
+from src.core.ports.normalizer import Normalizer
+
+Extractor = Callable[[Any], Any]
+
+_datetime_adapter = TypeAdapter(datetime)
+
+
+class FieldSpec(BaseModel):
+    """Where a normalized field comes from in a raw document, applied in the order of the attributes.
+
+    - `path`: keys walked from the document (or list item) root, missing keys and non-dict values give None.
+    - `lookup`: in a list of wrappers like `[{"Ec2AssetSourceSimple": {...}}]`, the first wrapped value of this key.
+    - `unwrap`: in a list of wrappers like `[{"HostAssetOpenPort": {...}}]`, the wrapped dicts under this key.
+    - `fields`: specs mapping every item of the list to a dict.
+    - `transform`: `count` (length of a non-empty value), `mac_colons` (`-` to `:`) or `datetime` (ISO 8601 parsing).
+    """
+    path: list[str] = Field(default_factory=list)
+    lookup: str | None = None
+    unwrap: str | None = None
+    fields: dict[str, 'FieldSpec'] | None = None
+    transform: Literal['count', 'mac_colons', 'datetime'] | None = None
+
+
+def _get_path(path: list[str]) -> Extractor:
+    if not path:
+        return lambda value: value
+    if len(path) == 1:
+        key = path[0]
+        return lambda value: value.get(key) if isinstance(value, dict) else None
+    first, *rest = path
+
+    def get(value):
+        value = value.get(first) if isinstance(value, dict) else None
+        for key in rest:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    return get
+
+
+def _lookup(key: str) -> Extractor:
+    def lookup(items):
+        for item in items if isinstance(items, list) else ():
+            for value in item.values() if isinstance(item, dict) else ():
+                if isinstance(value, dict) and key in value:
+                    return value[key]
+        return None
+
+    return lookup
+
+
+def _unwrap(key: str) -> Extractor:
+    def unwrap(items):
+        if not isinstance(items, list):
+            return []
+        return [
+            value for item in items
+            if isinstance(item, dict) and (value := item.get(key)) and isinstance(value, dict)
+        ]
+
+    return unwrap
+
+
+def _map_items(fields: dict[str, FieldSpec]) -> Extractor:
+    extractors = [(name, compile_field(spec)) for name, spec in fields.items()]
+    return lambda items: [{name: extract(item) for name, extract in extractors} for item in items or ()]
+
+
+def _parse_datetime(value):
+    return _datetime_adapter.validate_python(value) if value is not None else None
+
+
+TRANSFORMS: dict[str, Extractor] = {
+    'count': lambda value: len(value) if value else None,
+    'mac_colons': lambda value: value.replace('-', ':') if isinstance(value, str) else None,
+    'datetime': _parse_datetime,
+}
+
+
+def compile_field(spec: FieldSpec) -> Extractor:
+    """Compose the steps of a spec into one function, leaving out the steps it does not use."""
+    steps = [_get_path(spec.path)] if spec.path else []
+    if spec.lookup is not None:
+        steps.append(_lookup(spec.lookup))
+    if spec.unwrap is not None:
+        steps.append(_unwrap(spec.unwrap))
+    if spec.fields is not None:
+        steps.append(_map_items(spec.fields))
+    if spec.transform is not None:
+        steps.append(TRANSFORMS[spec.transform])
+
+    if not steps:
+        return lambda value: value
+    if len(steps) == 1:
+        return steps[0]
+
+    def extract(value):
+        for step in steps:
+            value = step(value)
+        return value
+
+    return extract
+
+
+def raw_projection(fields: dict[str, FieldSpec]) -> list[str] | None:
+    """Return the raw document paths the specs read, or None when a spec reads the whole document.
+
+    Paths under another read path are left out, Mongo rejecting overlapping projections.
+    """
+    if any(not spec.path for spec in fields.values()):
+        return None
+    projection = []
+    paths = {'.'.join(['data', *spec.path]) for spec in fields.values()}
+    for path in sorted(paths, key=lambda path: (len(path), path)):
+        if not any(path.startswith(f'{kept}.') for kept in projection):
+            projection.append(path)
+    return projection
+
+
+class CompiledNormalizer(Normalizer):
+    """Normalizer built from field specs compiled once into plain functions producing a dict per host.
+
+    The dict is validated once by `HostNormalizedData`. With `validate=False` the stored documents skip the model
+    altogether, trusting the source to send the right types (e.g. integer ports) and the specs of list items
+    to cover the fields of `OpenPort`/`Software`.
+    """
+
+    def __init__(self, fields: dict[str, FieldSpec], validate: bool = True):
+        self.fields = fields
+        self.validate = validate
+        self._extractors = [(name, compile_field(spec)) for name, spec in fields.items()]
+        # Unvalidated documents are laid out like `model_dump` output, defaults included.
+        extractors = dict(self._extractors)
+        self._layout = [
+            (name, extractors.get(name), field.default_factory or (lambda default=field.default: default))
+            for name, field in HostNormalizedData.model_fields.items() if not field.exclude
+        ]
+
+    def __reduce__(self):
+        # Compiled closures cannot be pickled, so processes receiving the normalizer compile the specs again.
+        return self.__class__, (self.fields, self.validate)
+
+    def to_dict(self, data: HostRawData) -> dict[str, Any]:
+        host_raw = data.data
+        document = {name: extract(host_raw) for name, extract in self._extractors}
+        document['sources'] = [data.source]
+        return document
+
+    def normalize(self, data: HostRawData) -> HostNormalizedData:
+        return HostNormalizedData.model_validate(self.to_dict(data))
+
+    def normalize_document(self, data: HostRawData) -> dict:
+        if self.validate:
+            return self.normalize(data).model_dump()
+        host_raw = data.data
+        document = {name: extract(host_raw) if extract else default() for name, extract, default in self._layout}
+        document['sources'] = [data.source]
+        return document
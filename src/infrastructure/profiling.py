@@ -0,0 +1,87 @@
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator
+
+from src.settings import PROFILE_INTERVAL_SECONDS, PROFILE_OUTPUT_DIR, PROFILE_STAGE
+
+logger = logging.getLogger(__name__)
+
+_profiled_stage = PROFILE_STAGE
+_written_paths: set[str] = set()
+
+
+class SamplingProfiler:
+    """Sample the stack of a thread at a fixed interval from a background thread.
+
+    Stacks are counted in the collapsed format read by flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._sampler.join()
+
+    def dump(self, path: str, append: bool = False) -> None:
+        with open(path, 'a' if append else 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if (frame := sys._current_frames().get(self.thread_id)) is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame: FrameType | None) -> str:
+        names = []
+        while frame is not None:
+            names.append(f'{frame.f_globals.get("__name__")}:{frame.f_code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+def enable_stage_profiling(stage: str) -> None:
+    """Profile `stage` in this process and in the processes it forks or spawns afterwards."""
+    global _profiled_stage
+    _profiled_stage = stage
+    os.environ['PROFILE_STAGE'] = stage
+
+
+@contextmanager
+def profile_stage(stage: str) -> Iterator[None]:
+    """Sample the calling thread while the block runs if `stage` is the profiled one, then dump its stacks.
+
+    Every process running the stage writes its own `<stage>-<pid>.folded` file into `PROFILE_OUTPUT_DIR`, a process
+    running it several times (e.g. a pool worker normalizing several ranges) appends to it.
+    """
+    if stage != _profiled_stage:
+        yield
+        return
+
+    profiler = SamplingProfiler()
+    try:
+        with profiler:
+            yield
+    finally:
+        os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_OUTPUT_DIR, f'{stage}-{os.getpid()}.folded')
+        profiler.dump(path, append=path in _written_paths)
+        _written_paths.add(path)
+        logger.info(f'Profile of {stage} with {sum(profiler.stacks.values())} samples written to {path}')
@@ -32,11 +32,21 @@ def dig(collection, *keys, default=None, return_default_if_none=False):
     return result
 
 
-def run_parallel(func: Callable, params: list[dict]):
+def _run_and_report(results: multiprocessing.SimpleQueue, index: int, func: Callable, **params):
+    results.put((index, func(**params)))
+
+
+def run_parallel(func: Callable, params: list[dict]) -> list:
+    """Run `func` once per params in its own process and return the results in the order of `params`.
+
+    Results travel back through a pipe, so they should be small (e.g. processed documents counts).
+    """
+    results = multiprocessing.SimpleQueue()
     processes = []
-    for param in params:
+    for index, param in enumerate(params):
         process = multiprocessing.Process(
-            target=func,
+            target=_run_and_report,
+            args=(results, index, func),
             kwargs=param,
         )
         processes.append(process)
@@ -46,10 +56,19 @@ def run_parallel(func: Callable, params: list[dict]):
     for process in processes:
         process.join()
 
+    failed = [process.exitcode for process in processes if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(f'{len(failed)} of {len(processes)} processes failed with exit codes {failed}')
+    collected = {}
+    while not results.empty():
+        index, result = results.get()
+        collected[index] = result
+    return [collected.get(index) for index in range(len(params))]
+
 
 def run_via_asyncio(coroutine: Coroutine):
     try:
         loop = asyncio.get_running_loop()
         return asyncio.create_task(coroutine)
     except RuntimeError:
-        asyncio.run(coroutine)
+        return asyncio.run(coroutine)
@@ -18,6 +18,20 @@ MONGODB_HOST = os.environ.get('MONGODB_HOST', 'localhost')
 MONGODB_PORT = os.environ.get('MONGODB_PORT', 27017)
 MONGODB_DATABASE = os.environ.get('MONGODB_DATABASE', 'main')
 MONGODB_URL = f'mongodb://{MONGODB_USER}:{MONGODB_PASSWORD}@{MONGODB_HOST}:{MONGODB_PORT}'
+MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 100))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0))
+MONGODB_COMPRESSORS = os.environ.get('MONGODB_COMPRESSORS', '')
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 30000))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS', 20000))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGODB_SOCKET_TIMEOUT_MS', 0)) or None
+MONGODB_CLIENT_OPTIONS = {
+    'maxPoolSize': MONGODB_MAX_POOL_SIZE,
+    'minPoolSize': MONGODB_MIN_POOL_SIZE,
+    'serverSelectionTimeoutMS': MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    'connectTimeoutMS': MONGODB_CONNECT_TIMEOUT_MS,
+    'socketTimeoutMS': MONGODB_SOCKET_TIMEOUT_MS,
+    **({'compressors': MONGODB_COMPRESSORS} if MONGODB_COMPRESSORS else {}),
+}
 
 QUALYS_API_KEY = os.environ.get('QUALYS_API_KEY')
 CROWDSTRIKE_API_KEY = os.environ.get('CROWDSTRIKE_API_KEY')
@@ -27,4 +41,23 @@ API_REQUESTS_RETRY_LIMIT = int(os.environ.get('API_REQUESTS_RETRY_LIMIT', 3))
 PIPELINE_CONFIG_PATH = os.environ.get('PIPELINE_CONFIG_PATH', 'configs/pipeline_config.json')
 PIPELINE_CONFIG = __get_config(PIPELINE_CONFIG_PATH)
 
-PLOTS_SOURCE_COLLECTION = os.getenv('PLOTS_SOURCE_COLLECTION', 'normalized_data')
+PLOTS_SOURCE_COLLECTION = os.getenv('PLOTS_SOURCE_COLLECTION', 'host_stats')
+PLOTS_CACHE_TTL_SECONDS = float(os.getenv('PLOTS_CACHE_TTL_SECONDS', 300))
+PLOTS_CACHE_MAX_ENTRIES = int(os.getenv('PLOTS_CACHE_MAX_ENTRIES', 256))
+PLOTS_RENDER_WORKERS = int(os.getenv('PLOTS_RENDER_WORKERS', 2))
+
+DATA_VERSIONS_COLLECTION = os.getenv('DATA_VERSIONS_COLLECTION', 'data_versions')
+
+PIPELINE_JOBS_COLLECTION = os.getenv('PIPELINE_JOBS_COLLECTION', 'pipeline_jobs')
+PIPELINE_LOCKS_COLLECTION = os.getenv('PIPELINE_LOCKS_COLLECTION', 'pipeline_locks')
+PIPELINE_LOCK_NAME = 'pipeline'
+# Running jobs refresh their lock every third of the TTL, so it only needs to cover a few missed refreshes.
+PIPELINE_LOCK_TTL_SECONDS = float(os.getenv('PIPELINE_LOCK_TTL_SECONDS', 5 * 60))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_PUSHGATEWAY_URL = os.getenv('METRICS_PUSHGATEWAY_URL')
+METRICS_JOB_NAME = os.getenv('METRICS_JOB_NAME', 'pipeline')
+
+PROFILE_STAGE = os.getenv('PROFILE_STAGE') or None
+PROFILE_INTERVAL_SECONDS = float(os.getenv('PROFILE_INTERVAL_SECONDS', 0.005))
+PROFILE_OUTPUT_DIR = os.getenv('PROFILE_OUTPUT_DIR', 'profiles')
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from contextlib import aclosing
+
+import pytest
+from aiohttp import ClientPayloadError
+
+from src.core.ports.api_client import APIClient, APIClientConfig, JSONArrayParser
+from src.settings import API_REQUESTS_RETRY_LIMIT
+
+
+def parse(body: bytes, chunk_size: int) -> list:
+    parser = JSONArrayParser()
+    items = []
+    for start in range(0, len(body), chunk_size):
+        items.extend(parser.feed(body[start:start + chunk_size]))
+    items.extend(parser.close())
+    return items
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 8, 1024])
+@pytest.mark.parametrize('array', [
+    [1, 2, 123],
+    [-1.5e10, 0, 42, True, False, None],
+    ['a', 'é', '', 12345678901234567890],
+    [{'hostname': 'host-1', 'open_ports': [22, 443]}, {'hostname': 'hôte-2'}, [], {}],
+    [],
+])
+def test_items_are_parsed_whatever_the_chunks(array: list, chunk_size: int):
+    assert parse(json.dumps(array).encode(), chunk_size) == array
+
+
+@pytest.mark.parametrize('body', [b'', b'  \n'])
+def test_empty_body_has_no_items(body: bytes):
+    assert parse(body, 8) == []
+
+
+@pytest.mark.parametrize('body', [b'[1, 2, 12', b'[{"hostname": "host-1"}', b'['])
+def test_truncated_array_is_reported(body: bytes):
+    with pytest.raises(ValueError, match='Truncated'):
+        parse(body, 8)
+
+
+def test_body_not_an_array_is_reported():
+    with pytest.raises(ValueError, match='Expected a JSON array'):
+        parse(b'{"hosts": []}', 8)
+
+
+class FlakyAPIClient(APIClient):
+    """Serves pages whose body fails to be read after `fail_after` hosts the first `failures` times."""
+    slug = 'flaky'
+    endpoint_url = 'http://vendor.test/hosts'
+    method = 'GET'
+
+    def __init__(self, hosts: list[dict], failures: int, fail_after: int = 2):
+        super().__init__(APIClientConfig(slug=self.slug, api_token='token', limit=len(hosts)))
+        self.hosts, self.failures, self.fail_after = hosts, failures, fail_after
+        self.requests = 0
+
+    async def get_page(self, session, limit: int, offset: int) -> list[dict]:
+        self.requests += 1
+        return self.hosts[offset:offset + limit]
+
+    async def read_page(self, page: list[dict]):
+        for start in range(0, len(page), self.fail_after):
+            if start and self.failures:
+                self.failures -= 1
+                raise ClientPayloadError('Response payload is not completed')
+            yield page[start:start + self.fail_after]
+
+
+def read_pages(client: FlakyAPIClient) -> list[dict]:
+    async def run():
+        page = await client.get_page(None, client.config.limit, 0)
+        async with aclosing(client.read_page_retrying(None, page, client.config.limit, 0)) as contents:
+            return [host async for content in contents for host in content]
+
+    return asyncio.run(run())
+
+
+def test_page_is_requested_again_when_its_body_fails():
+    hosts = [{'hostname': f'host-{index}'} for index in range(5)]
+    client = FlakyAPIClient(hosts, failures=1)
+
+    assert read_pages(client) == hosts
+    assert client.requests == 2
+
+
+def test_body_failures_are_retried_up_to_the_limit():
+    client = FlakyAPIClient([{'hostname': f'host-{index}'} for index in range(5)], failures=10)
+
+    with pytest.raises(ClientPayloadError):
+        read_pages(client)
+    assert client.requests == API_REQUESTS_RETRY_LIMIT
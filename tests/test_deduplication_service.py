@@ -0,0 +1,52 @@
+import asyncio
+
+from src.application.services.blocking_index import BlockingConfig
+from src.application.services.deduplication_service import DeduplicationService
+from src.core.entities import HostNormalizedData
+from src.infrastructure.db.memory.repositories import InMemoryDatabase, InMemoryHostNormalizedDataRepository
+from src.infrastructure.ports.mergers.priority_merger import PrioritySourceMerger
+
+COLLECTION = 'normalized_data'
+MERGER = PrioritySourceMerger(source_priorities={'qualys': 2, 'crowdstrike': 1})
+
+
+def deduplicate(documents: list[HostNormalizedData],
+                blocking: BlockingConfig | None = None) -> list[HostNormalizedData]:
+    async def run():
+        repository = InMemoryHostNormalizedDataRepository(InMemoryDatabase())
+        await repository.save_normalized_data(COLLECTION, documents)
+        await DeduplicationService(COLLECTION, repository, MERGER, blocking=blocking).deduplicate(incremental=True)
+        return [document async for batch in repository.get_normalized_data(COLLECTION) for document in batch]
+
+    return asyncio.run(run())
+
+
+HOSTS = [
+    HostNormalizedData(hostname='Host-1.corp.local', local_ip='10.0.0.1', external_ip='1.2.3.4', sources=['qualys']),
+    HostNormalizedData(hostname='host-1', local_ip='10.0.0.1', os_version='Windows 11', sources=['crowdstrike']),
+    HostNormalizedData(hostname='host-2', local_ip='10.0.0.2', mac_address='00-11-22-33-44-55',
+                       sources=['qualys']),
+    HostNormalizedData(hostname='laptop-2', local_ip='10.0.0.9', mac_address='00:11:22:33:44:55',
+                       os_version='Ubuntu 24.04', sources=['crowdstrike']),
+]
+
+
+def test_unique_keys_match_only_equal_hosts():
+    assert len(deduplicate(HOSTS)) == 4
+
+
+def test_blocking_keys_match_short_hostnames_and_mac_addresses():
+    merged = deduplicate(HOSTS, BlockingConfig(enabled=True))
+
+    assert sorted((document.hostname, document.os_version, document.sources) for document in merged) == [
+        ('Host-1.corp.local', 'Windows 11', ['qualys', 'crowdstrike']),
+        ('host-2', 'Ubuntu 24.04', ['qualys', 'crowdstrike']),
+    ]
+
+
+def test_blocks_larger_than_the_limit_are_skipped():
+    hosts = [HostNormalizedData(hostname='localhost', local_ip='127.0.0.1', external_ip=f'1.2.3.{index}',
+                                sources=['qualys']) for index in range(3)]
+
+    assert len(deduplicate(hosts, BlockingConfig(enabled=True, max_block_size=2))) == 3
+    assert len(deduplicate(hosts, BlockingConfig(enabled=True, max_block_size=3))) == 1
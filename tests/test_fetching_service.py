@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.application.services.fetching_service import FetchingService
+from src.application.services.streaming_service import StreamingPipelineService
+from src.core.ports.api_client import APIClient, APIClientConfig
+from src.infrastructure.db.memory.repositories import (InMemoryDatabase, InMemoryFetchingStateRepository,
+                                                       InMemoryHostNormalizedDataRepository,
+                                                       InMemoryHostRawDataRepository)
+from src.infrastructure.dependencies import NORMALIZERS
+
+RAW_COLLECTION = 'crowdstrike_raw'
+NORMALIZED_COLLECTION = 'normalized_data'
+STATE_COLLECTION = 'fetching_state'
+
+
+def host(device_id: str, last_seen: str, **data) -> dict:
+    return {'device_id': device_id, 'hostname': f'host-{device_id}', 'local_ip': '10.0.0.1', 'last_seen': last_seen,
+            **data}
+
+
+class ListAPIClient(APIClient):
+    """Serves `hosts` by pages of `limit`, failing after `fail_after_pages` pages if set."""
+    slug = 'crowdstrike'
+    endpoint_url = 'http://vendor.test/hosts'
+    method = 'GET'
+
+    def __init__(self, hosts: list[dict], fail_after_pages: int | None = None):
+        super().__init__(APIClientConfig(slug=self.slug, api_token='token', limit=2))
+        self.hosts = hosts
+        self.fail_after_pages = fail_after_pages
+
+    async def fetch_hosts(self, batch_size: int = 10, offset: int | None = None):
+        for page, start in enumerate(range(offset or 0, len(self.hosts), self.config.limit)):
+            if page == self.fail_after_pages:
+                raise ConnectionError('Vendor API went away')
+            yield self.hosts[start:start + self.config.limit]
+
+
+def fetching_service(database: InMemoryDatabase, api_client: APIClient) -> FetchingService:
+    return FetchingService(
+        source='crowdstrike',
+        collection=RAW_COLLECTION,
+        repository=InMemoryHostRawDataRepository(database),
+        api_client=api_client,
+        state_repository=InMemoryFetchingStateRepository(database),
+        state_collection=STATE_COLLECTION,
+        incremental=True,
+        cursor_field='last_seen',
+        id_field='device_id',
+    )
+
+
+def fetch(database: InMemoryDatabase, hosts: list[dict], full_resync: bool = False) -> int:
+    return asyncio.run(fetching_service(database, ListAPIClient(hosts)).fetch_data(full_resync=full_resync))
+
+
+def pending_hosts(database: InMemoryDatabase) -> list[str]:
+    return [document['data']['device_id'] for document in database[RAW_COLLECTION].values()
+            if 'normalize_pending' in document]
+
+
+def normalize_all(database: InMemoryDatabase) -> None:
+    async def run():
+        repository = InMemoryHostRawDataRepository(database)
+        marker = await repository.claim_normalize_pending(RAW_COLLECTION)
+        await repository.clear_normalize_pending(RAW_COLLECTION, marker)
+
+    asyncio.run(run())
+
+
+def test_incremental_fetch_keeps_hosts_past_the_watermark_or_the_checkpoint_offset():
+    database = InMemoryDatabase()
+    assert fetch(database, [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-02T00:00:00')]) == 2
+    assert database[STATE_COLLECTION]['crowdstrike']['cursor_value'] == datetime(2024, 1, 2)
+    assert database[STATE_COLLECTION]['crowdstrike']['offset'] == 2
+
+    kept = fetch(database, [
+        host('a', '2024-01-01T00:00:00'),
+        host('b', '2024-01-03T00:00:00'),
+        # Past the previous run's offset, so new even though seen before the watermark.
+        host('c', '2023-12-31T00:00:00'),
+    ])
+    assert kept == 2
+    assert database[STATE_COLLECTION]['crowdstrike']['cursor_value'] == datetime(2024, 1, 3)
+    assert database[STATE_COLLECTION]['crowdstrike']['offset'] == 3
+
+
+def test_full_resync_ignores_the_watermark():
+    database = InMemoryDatabase()
+    hosts = [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-02T00:00:00')]
+    fetch(database, hosts)
+
+    assert fetch(database, hosts) == 0
+    assert fetch(database, hosts, full_resync=True) == 2
+
+
+def test_interrupted_fetch_does_not_move_the_checkpoint():
+    database = InMemoryDatabase()
+    fetch(database, [host('a', '2024-01-01T00:00:00')])
+    hosts = [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-02T00:00:00'), host('c', '2024-01-03T00:00:00')]
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(fetching_service(database, ListAPIClient(hosts, fail_after_pages=1)).fetch_data())
+    assert database[STATE_COLLECTION]['crowdstrike']['cursor_value'] == datetime(2024, 1, 1)
+    assert database[STATE_COLLECTION]['crowdstrike']['offset'] == 1
+
+
+def test_unchanged_hosts_are_not_rewritten_nor_normalized_again():
+    database = InMemoryDatabase()
+    fetch(database, [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-01T00:00:00')])
+    assert pending_hosts(database) == ['a', 'b']
+    normalize_all(database)
+
+    fetch(database, [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-01T00:00:00', os_version='Windows 11')],
+          full_resync=True)
+    assert len(database[RAW_COLLECTION]) == 2
+    assert pending_hosts(database) == ['b']
+    [changed] = [document for document in database[RAW_COLLECTION].values() if document['data']['device_id'] == 'b']
+    assert changed['data']['os_version'] == 'Windows 11'
+
+
+def test_streaming_writes_normalized_hosts_and_archives_raw_data_as_normalized():
+    database = InMemoryDatabase()
+    hosts = [host('a', '2024-01-01T00:00:00'), host('b', '2024-01-02T00:00:00'), host('c', '2024-01-03T00:00:00')]
+    service = StreamingPipelineService(
+        fetching_service=fetching_service(database, ListAPIClient(hosts)),
+        normalizer=NORMALIZERS['crowdstrike'],
+        normal_repository=InMemoryHostNormalizedDataRepository(database),
+        target_collection=NORMALIZED_COLLECTION,
+        queue_size=1,
+    )
+
+    assert asyncio.run(service.run()) == 3
+    records = list(database[NORMALIZED_COLLECTION].values())
+    assert [record.hostname for record in records] == ['host-a', 'host-b', 'host-c']
+    assert all(record.dedup_pending for record in records)
+    assert len(database[RAW_COLLECTION]) == 3
+    assert pending_hosts(database) == []
+    assert database[STATE_COLLECTION]['crowdstrike']['cursor_value'] == datetime(2024, 1, 3)
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from src.infrastructure import pipeline
+from src.infrastructure.pipeline import PipelineLockHeartbeat, run_locked_step
+
+
+@pytest.fixture
+def lock_refreshes(monkeypatch) -> list[bool]:
+    """Results of the next pipeline lock refreshes, the lock being held once they are exhausted."""
+    results = []
+    monkeypatch.setattr(pipeline, 'refresh_pipeline_lock', lambda owner: results.pop(0) if results else True)
+    return results
+
+
+def test_step_runs_while_the_lock_is_held(lock_refreshes):
+    documents, _ = run_locked_step('job-1', 'stats', lambda: 3)
+
+    assert documents == 3
+
+
+def test_step_does_not_run_once_the_lock_is_lost(lock_refreshes):
+    lock_refreshes.append(False)
+    ran = []
+
+    with pytest.raises(RuntimeError, match='before step stats'):
+        run_locked_step('job-1', 'stats', lambda: ran.append(True))
+    assert not ran
+
+
+def test_heartbeat_reports_a_lock_lost_while_a_step_runs(lock_refreshes):
+    lock_refreshes.extend([True, False])
+
+    with PipelineLockHeartbeat('job-1', interval=0.01) as heartbeat:
+        assert heartbeat.lost.wait(timeout=5)
+    assert not lock_refreshes
+
+
+def test_heartbeat_survives_transient_errors(monkeypatch):
+    calls = []
+
+    def refresh(owner: str) -> bool:
+        calls.append(owner)
+        if len(calls) == 1:
+            raise ConnectionError('Mongo is restarting')
+        return True
+
+    monkeypatch.setattr(pipeline, 'refresh_pipeline_lock', refresh)
+    with PipelineLockHeartbeat('job-1', interval=0.01) as heartbeat:
+        while len(calls) < 3:
+            time.sleep(0.01)
+    assert not heartbeat.lost.is_set()
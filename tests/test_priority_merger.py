@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.application.services.deduplication_service import DeduplicationService
+from src.core.entities import HostNormalizedData, OpenPort
+from src.infrastructure.db.memory.repositories import InMemoryDatabase, InMemoryHostNormalizedDataRepository
+from src.infrastructure.ports.mergers.priority_merger import PrioritySourceMerger
+
+COLLECTION = 'normalized_data'
+SOURCE_PRIORITIES = {'qualys': 2, 'crowdstrike': 1}
+
+
+def host(source: str, **fields) -> HostNormalizedData:
+    return HostNormalizedData(hostname='host-1', local_ip='10.0.0.1', sources=[source], **fields)
+
+
+def run_deduplication(repository: InMemoryHostNormalizedDataRepository, merger: PrioritySourceMerger,
+                      documents: list[HostNormalizedData]) -> list[HostNormalizedData]:
+    async def run():
+        await repository.save_normalized_data(COLLECTION, documents)
+        await DeduplicationService(COLLECTION, repository, merger).deduplicate(incremental=True)
+        return [document async for batch in repository.get_normalized_data(COLLECTION) for document in batch]
+
+    return asyncio.run(run())
+
+
+def test_fresh_documents_win_over_the_previous_merge():
+    repository = InMemoryHostNormalizedDataRepository(InMemoryDatabase())
+    merger = PrioritySourceMerger(source_priorities=SOURCE_PRIORITIES)
+
+    [merged] = run_deduplication(repository, merger, [
+        host('crowdstrike', os_version='Windows 10', mac_address='00:11:22:33:44:55'),
+        host('qualys', os_version='Windows 10 Pro'),
+    ])
+    assert merged.sources == ['qualys', 'crowdstrike']
+    assert merged.os_version == 'Windows 10 Pro'
+
+    [merged] = run_deduplication(repository, merger, [host('qualys', os_version='Windows 11 Pro')])
+    assert merged.os_version == 'Windows 11 Pro'
+    assert merged.mac_address == '00:11:22:33:44:55'
+    assert merged.sources == ['qualys', 'crowdstrike']
+    assert merged.dedup_pending is None
+
+
+def test_strategies_replace_the_previous_merge_with_fresh_values():
+    repository = InMemoryHostNormalizedDataRepository(InMemoryDatabase())
+    merger = PrioritySourceMerger(source_priorities=SOURCE_PRIORITIES,
+                                  strategies={'open_ports': 'union', 'vuln_count': 'max'})
+
+    run_deduplication(repository, merger, [
+        host('qualys', open_ports=[OpenPort(port=22, protocol='tcp'), OpenPort(port=80, protocol='tcp')],
+             vuln_count=12),
+        host('crowdstrike', first_seen_at=datetime(2024, 1, 1)),
+    ])
+    [merged] = run_deduplication(repository, merger, [
+        host('qualys', open_ports=[OpenPort(port=22, protocol='tcp')], vuln_count=3),
+    ])
+    assert [port.port for port in merged.open_ports] == [22]
+    assert merged.open_ports_count == 1
+    assert merged.vuln_count == 3
+    # Fields no fresh document has are kept from the previous merge.
+    assert merged.first_seen_at == datetime(2024, 1, 1)
+
+
+def test_strategies_keep_the_values_of_the_sources_not_normalized_again():
+    repository = InMemoryHostNormalizedDataRepository(InMemoryDatabase())
+    merger = PrioritySourceMerger(source_priorities=SOURCE_PRIORITIES,
+                                  strategies={'open_ports': 'union', 'vuln_count': 'sum'})
+
+    [merged] = run_deduplication(repository, merger, [
+        host('qualys', open_ports=[OpenPort(port=22, protocol='tcp')], first_seen_at=datetime(2020, 1, 1),
+             vuln_count=2),
+        host('crowdstrike', open_ports=[OpenPort(port=443, protocol='tcp')], first_seen_at=datetime(2021, 1, 1),
+             vuln_count=5),
+    ])
+    assert [port.port for port in merged.open_ports] == [22, 443]
+    assert merged.vuln_count == 7
+
+    [merged] = run_deduplication(repository, merger, [
+        host('crowdstrike', open_ports=[OpenPort(port=8443, protocol='tcp')], first_seen_at=datetime(2022, 1, 1),
+             vuln_count=1),
+    ])
+    assert [port.port for port in merged.open_ports] == [22, 8443]
+    assert merged.open_ports_count == 2
+    assert merged.vuln_count == 3
+    assert merged.first_seen_at == datetime(2020, 1, 1)
+    assert merged.sources == ['qualys', 'crowdstrike']
+
+
+@pytest.mark.parametrize('name, strategy', [
+    ('hostname', 'sum'),
+    ('first_seen_at', 'sum'),
+    ('os_version', 'max'),
+    ('open_ports', 'min'),
+    ('vuln_count', 'union'),
+])
+def test_strategy_must_fit_the_field_type(name, strategy):
+    with pytest.raises(ValueError):
+        PrioritySourceMerger(source_priorities=SOURCE_PRIORITIES, strategies={name: strategy})